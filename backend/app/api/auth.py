@@ -6,24 +6,57 @@ import hashlib
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from eth_account.messages import encode_defunct
-from web3 import Web3
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.core.security import verify_token
 from app.core.jwt import create_backend_jwt
 from datetime import timedelta, datetime
 from app.models.user import User
 from app.core.config import settings
+from app.core.http import upstreams, PRIVY
+from app.core.concurrency import run_blocking
+from app.core.timing import TimedRoute, measure
+from app.core.cache import TTLCache
+from app.core.nonce_store import nonce_store
+from app.core.signatures import signature_workers, recover_personal_sign
+from app.polymarket.l2_signer import l2_signers
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 security = HTTPBearer()
 
-# In-memory nonce storage (in production, use Redis or DB)
-nonce_store: dict[str, tuple[str, datetime]] = {}
+
+# Authenticated users by normalized wallet address (detached User instances)
+user_cache = TTLCache("user", ttl=settings.USER_CACHE_TTL, max_size=settings.USER_CACHE_MAX_SIZE)
+
+def invalidate_user_cache(*addresses: str) -> None:
+    """Drop cached users (and their L2 signers) for the given wallet addresses"""
+    for address in addresses:
+        if address:
+            user_cache.invalidate(address.lower())
+    l2_signers.invalidate(*addresses)
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_changed_users(session, flush_context):
+    """Remember wallet addresses (old and new) of users changed in this transaction"""
+    addresses = session.info.setdefault("changed_user_addresses", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            addresses.add(obj.wallet_address)
+            addresses.update(inspect(obj).attrs.wallet_address.history.deleted or ())
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_changed_users(session):
+    # enable-trading confirm, set-funder-address, set-wallet etc. all commit user
+    # changes through the request session, so invalidation happens here once
+    invalidate_user_cache(*session.info.pop("changed_user_addresses", ()))
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_addresses", None)
 
 class PrivyLoginRequest(BaseModel):
     accessToken: str  # Privy accessToken (JWT) that backend will validate (DEPRECATED)
@@ -49,19 +82,10 @@ async def get_nonce(address: str = Query(..., description="EOA wallet address"))
     # Generate random nonce
     nonce = secrets.token_hex(32)
     
-    # Store nonce with timestamp (expires in 5 minutes)
-    nonce_store[address] = (nonce, datetime.utcnow())
-    
-    # Cleanup old nonces (older than 5 minutes)
-    now = datetime.utcnow()
-    expired_keys = [
-        k for k, (_, ts) in nonce_store.items() 
-        if (now - ts).total_seconds() > 300
-    ]
-    for key in expired_keys:
-        del nonce_store[key]
+    # Store nonce (expires after NONCE_TTL, 5 minutes by default)
+    await nonce_store.issue(address, nonce)
     
-    print(f"[Auth Nonce] Generated nonce for address: {address}")
+    logger.debug("[Auth Nonce] Generated nonce for address: %s", address)
     
     return {"nonce": nonce}
 
@@ -80,25 +104,23 @@ async def authenticate(
     """
     address = payload.address.lower()
     
-    print(f"[Auth] Authentication request for address: {address}")
+    logger.debug("[Auth] Authentication request for address: %s", address)
     
     # Verify signature
     try:
-        # Recover address from signature
-        message = encode_defunct(text=payload.message)
-        recovered_address = Web3().eth.account.recover_message(message, signature=payload.signature)
-        recovered_address = recovered_address.lower()
+        # Recover address from signature (CPU-bound, runs in the signature worker pool)
+        recovered_address = await signature_workers.run(recover_personal_sign, payload.message, payload.signature)
         
         if recovered_address != address:
-            print(f"[Auth] ❌ Signature verification failed: recovered {recovered_address}, expected {address}")
+            logger.warning("[Auth] Signature verification failed: recovered %s, expected %s", recovered_address, address)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Signature verification failed"
             )
         
-        print(f"[Auth] ✅ Signature verified for address: {address}")
+        logger.debug("[Auth] Signature verified for address: %s", address)
     except Exception as e:
-        print(f"[Auth] ❌ Error verifying signature: {e}")
+        logger.warning("[Auth] Error verifying signature: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid signature: {str(e)}"
@@ -106,38 +128,33 @@ async def authenticate(
     
     # Verify nonce from message
     # Message format: "Sign this message to authenticate with Marketsport.\n\nAddress: {address}\nNonce: {nonce}"
-    if address not in nonce_store:
-        print(f"[Auth] ❌ No nonce found for address: {address}")
+    stored_nonce = await nonce_store.get(address)
+    if stored_nonce is None:
+        logger.warning("[Auth] No nonce found (or expired) for address: %s", address)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nonce not found or expired. Please request a new nonce."
         )
     
-    stored_nonce, nonce_timestamp = nonce_store[address]
-    
-    # Check nonce expiration (5 minutes)
-    if (datetime.utcnow() - nonce_timestamp).total_seconds() > 300:
-        print(f"[Auth] ❌ Nonce expired for address: {address}")
-        del nonce_store[address]
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Nonce expired. Please request a new nonce."
-        )
-    
     # Extract nonce from message
     if f"Nonce: {stored_nonce}" not in payload.message:
-        print(f"[Auth] ❌ Nonce mismatch in message for address: {address}")
+        logger.warning("[Auth] Nonce mismatch in message for address: %s", address)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nonce mismatch"
         )
     
-    # Nonce used, remove it
-    del nonce_store[address]
+    # Nonce used, remove it (fails if a concurrent request already consumed it)
+    if not await nonce_store.consume(address, stored_nonce):
+        logger.warning("[Auth] Nonce already used for address: %s", address)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Nonce not found or expired. Please request a new nonce."
+        )
     
     # Find or create user
     try:
-        user = db.query(User).filter(User.wallet_address == address).first()
+        user = await run_blocking(db.query(User).filter(User.wallet_address == address).first)
         
         if not user:
             user = User(
@@ -145,23 +162,21 @@ async def authenticate(
                 wallet_address=address
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
-            print(f"[Auth] ✅ Created new user for address: {address}")
+            await run_blocking(db.commit)
+            await run_blocking(db.refresh, user)
+            logger.debug("[Auth] Created new user for address: %s", address)
         else:
             # Update wallet address if changed (shouldn't happen for EOA)
             if user.wallet_address and user.wallet_address.lower() != address:
                 user.wallet_address = address
-                db.commit()
-                db.refresh(user)
-                print(f"[Auth] ✅ Updated wallet address for user: {address}")
+                await run_blocking(db.commit)
+                await run_blocking(db.refresh, user)
+                logger.debug("[Auth] Updated wallet address for user: %s", address)
             else:
-                print(f"[Auth] ✅ Found existing user for address: {address}")
+                logger.debug("[Auth] Found existing user for address: %s", address)
     except Exception as db_error:
-        print(f"[Auth] ❌ Database error: {db_error}")
-        import traceback
-        traceback.print_exc()
-        db.rollback()
+        logger.exception("[Auth] Database error: %s", db_error)
+        await run_blocking(db.rollback)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Database error: {str(db_error)}"
@@ -175,11 +190,11 @@ async def authenticate(
     
     backend_jwt = create_backend_jwt(jwt_payload)
     
-    print(f"[Auth] ✅ Authentication successful for address: {address}")
+    logger.debug("[Auth] Authentication successful for address: %s", address)
     
     return TokenResponse(access_token=backend_jwt)
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -191,8 +206,15 @@ def get_current_user(
     - address: User's EOA wallet address
     
     This uses address-based authentication (SIWE-style)
+    
+    Users are cached per address for USER_CACHE_TTL seconds; committing any
+    change to a User invalidates its entry (see _invalidate_changed_users).
     """
-    token = credentials.credentials
+    with measure("auth"):
+        return await _resolve_user(credentials.credentials, db)
+
+
+async def _resolve_user(token: str, db: Session) -> User:
     payload = verify_token(token)
     if payload is None:
         raise HTTPException(
@@ -213,6 +235,24 @@ def get_current_user(
     # Normalize address
     address = address.lower()
     
+    # Single-flight per address; a commit that invalidates the address while the
+    # SELECT runs keeps its (pre-commit) result out of the cache
+    cached = await user_cache.get_or_load(address, lambda: run_blocking(_load_user, address))
+    
+    # Attach a copy to this request's session without a SELECT, so handlers
+    # can modify and commit it as usual
+    return db.merge(cached, load=False)
+
+def _load_user(address: str) -> User:
+    """_load_user_detached in its own session (the load is shared by concurrent requests)"""
+    db = SessionLocal()
+    try:
+        return _load_user_detached(db, address)
+    finally:
+        db.close()
+
+def _load_user_detached(db: Session, address: str) -> User:
+    """Find (or create) the user for address and detach it from the session for caching"""
     # Find user by wallet_address (primary identifier for trading)
     user = db.query(User).filter(User.wallet_address == address).first()
     
@@ -225,8 +265,9 @@ def get_current_user(
         db.add(user)
         db.commit()
         db.refresh(user)
-        print(f"[get_current_user] Created new user for address: {address}")
+        logger.debug("[get_current_user] Created new user for address: %s", address)
     
+    db.expunge(user)
     return user
 
 @router.post("/privy-login", response_model=TokenResponse)
@@ -246,41 +287,40 @@ async def privy_login(
     3) Достаём user.id и wallet.address.
     4) Отдаём наш backend JWT, который фронт будет использовать дальше.
     """
-    # Логируем входящий запрос (используем print для systemd)
-    print(f"[Privy Login] Request received. accessToken length: {len(payload.accessToken) if payload.accessToken else 0}")
+    # Логируем входящий запрос (DEBUG)
+    logger.debug("[Privy Login] Request received. accessToken length: %s", len(payload.accessToken) if payload.accessToken else 0)
     
     if not payload.accessToken:
-        print("[Privy Login] ERROR: Missing Privy accessToken in request")
+        logger.warning("[Privy Login] ERROR: Missing Privy accessToken in request")
         raise HTTPException(status_code=400, detail="Missing Privy accessToken")
 
     # Правильный endpoint Privy API: GET /v1/users/me с Bearer токеном пользователя
     # Не требуется PRIVY_APP_SECRET для этого endpoint - используется Bearer токен пользователя
     PRIVY_USERS_ME_URL = f"{settings.PRIVY_API_URL}/users/me"
     
-    print(f"[Privy Login] Calling Privy API: {PRIVY_USERS_ME_URL}")
-    print(f"[Privy Login] Using Bearer token (user's accessToken)")
+    logger.debug("[Privy Login] Calling Privy API: %s", PRIVY_USERS_ME_URL)
+    logger.debug("[Privy Login] Using Bearer token (user's accessToken)")
 
     if not settings.PRIVY_APP_ID:
-        print("[Privy Login] ERROR: PRIVY_APP_ID not configured")
+        logger.warning("[Privy Login] ERROR: PRIVY_APP_ID not configured")
         raise HTTPException(status_code=500, detail="Privy configuration error: PRIVY_APP_ID not set")
 
     try:
         # GET /v1/users/me с Bearer токеном пользователя (accessToken)
         # ВАЖНО: Privy требует заголовок privy-app-id
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(
-                PRIVY_USERS_ME_URL,
-                headers={
-                    "Authorization": f"Bearer {payload.accessToken}",  # Bearer токен пользователя
-                    "privy-app-id": settings.PRIVY_APP_ID,  # ВАЖНО: Privy требует этот заголовок
-                    "Accept": "application/json",
-                },
-            )
+        resp = await upstreams.get(PRIVY).get(
+            PRIVY_USERS_ME_URL,
+            headers={
+                "Authorization": f"Bearer {payload.accessToken}",  # Bearer токен пользователя
+                "privy-app-id": settings.PRIVY_APP_ID,  # ВАЖНО: Privy требует этот заголовок
+                "Accept": "application/json",
+            },
+        )
 
-        # логируем всё, что пришло от Privy (используем print для systemd)
-        print(f"[Privy Login] Privy API response: status={resp.status_code}")
-        print(f"[Privy Login] Privy API response headers: {dict(resp.headers)}")
-        print(f"[Privy Login] Privy API response body: {resp.text[:500] if resp.text else 'No body'}")
+        # логируем всё, что пришло от Privy (DEBUG, секреты маскируются)
+        logger.debug("[Privy Login] Privy API response: status=%s", resp.status_code)
+        logger.debug("[Privy Login] Privy API response headers: %s", resp.headers)
+        logger.debug("[Privy Login] Privy API response body: %s", resp.text[:500] if resp.text else 'No body')
     except httpx.RequestError as e:
         logger.error("Network error calling Privy API: %s", str(e))
         raise HTTPException(
@@ -290,7 +330,7 @@ async def privy_login(
 
     if resp.status_code == 429:
         # rate limit – возвращаем 429, чтобы фронт понял что это rate limit
-        print(f"[Privy Login] Rate limit detected: {resp.text}")
+        logger.debug("[Privy Login] Rate limit detected: %s", resp.text)
         raise HTTPException(
             status_code=429, detail="Privy rate limited, try again later"
         )
@@ -303,7 +343,7 @@ async def privy_login(
             resp.status_code,
             error_detail,
         )
-        print(f"[Privy Login] Privy API error {resp.status_code}: {error_detail}")
+        logger.debug("[Privy Login] Privy API error %s: %s", resp.status_code, error_detail)
         
         raise HTTPException(
             status_code=500,
@@ -322,9 +362,9 @@ async def privy_login(
     wallets = user.get("wallets", [])
     wallet_address = None
     
-    print(f"[Privy Login] Searching for Privy embedded wallet...")
-    print(f"[Privy Login] linked_accounts count: {len(linked_accounts)}")
-    print(f"[Privy Login] wallets count: {len(wallets)}")
+    logger.debug("[Privy Login] Searching for Privy embedded wallet...")
+    logger.debug("[Privy Login] linked_accounts count: %s", len(linked_accounts))
+    logger.debug("[Privy Login] wallets count: %s", len(wallets))
     
     # ✅ Шаг 1: Ищем embedded/privy wallet в linked_accounts
     # Embedded wallet имеет поле "id" в linked_accounts (внешние кошельки его не имеют)
@@ -341,7 +381,7 @@ async def privy_login(
             
             if address and is_embedded:
                 wallet_address = address
-                print(f"[Privy Login] ✅ Found Privy embedded wallet in linked_accounts: {address} (has_id: {has_id}, type: {wallet_client_type or wallet_client_type_alt})")
+                logger.debug("[Privy Login] Found Privy embedded wallet in linked_accounts: %s (has_id: %s, type: %s)", address, has_id, wallet_client_type or wallet_client_type_alt)
                 break
     
     # ✅ Шаг 2: Ищем embedded/privy wallet в wallets array
@@ -352,7 +392,7 @@ async def privy_login(
             address = wallet.get("address")
             if address and (wallet_client_type in ["privy", "embedded"] or wallet_type in ["embedded", "privy"]):
                 wallet_address = address
-                print(f"[Privy Login] ✅ Found Privy embedded wallet in wallets: {address} (clientType: {wallet_client_type}, type: {wallet_type})")
+                logger.debug("[Privy Login] Found Privy embedded wallet in wallets: %s (clientType: %s, type: %s)", address, wallet_client_type, wallet_type)
                 break
     
     # ✅ Шаг 3: Fallback - ищем любой wallet с type="wallet" в linked_accounts
@@ -362,14 +402,14 @@ async def privy_login(
                 address = account.get("address")
                 if address:
                     wallet_address = address
-                    print(f"[Privy Login] ⚠️ Fallback: Using wallet from linked_accounts: {address}")
+                    logger.warning("[Privy Login] Fallback: Using wallet from linked_accounts: %s", address)
                     break
     
     # ✅ Шаг 4: Fallback - первый wallet из wallets array
     if not wallet_address and wallets:
         wallet_address = wallets[0].get("address")
         if wallet_address:
-            print(f"[Privy Login] ⚠️ Fallback: Using first wallet from wallets array: {wallet_address}")
+            logger.warning("[Privy Login] Fallback: Using first wallet from wallets array: %s", wallet_address)
     
     # ✅ Шаг 5: Последний fallback - wallet напрямую в user объекте
     if not wallet_address:
@@ -377,7 +417,7 @@ async def privy_login(
         if wallet_obj:
             wallet_address = wallet_obj.get("address")
             if wallet_address:
-                print(f"[Privy Login] ⚠️ Fallback: Using wallet from user object: {wallet_address}")
+                logger.warning("[Privy Login] Fallback: Using wallet from user object: %s", wallet_address)
 
     if not privy_user_id:
         logger.error("Privy user ID not found in response: %s", data)
@@ -395,7 +435,7 @@ async def privy_login(
     wallet_address = wallet_address.lower()
 
     # Find or create user in our database
-    db_user = db.query(User).filter(User.did == privy_user_id).first()
+    db_user = await run_blocking(db.query(User).filter(User.did == privy_user_id).first)
     
     if not db_user:
         db_user = User(
@@ -403,13 +443,13 @@ async def privy_login(
             wallet_address=wallet_address
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await run_blocking(db.commit)
+        await run_blocking(db.refresh, db_user)
     else:
         # Update wallet if changed
         if db_user.wallet_address.lower() != wallet_address:
             db_user.wallet_address = wallet_address
-            db.commit()
+            await run_blocking(db.commit)
 
     # Здесь зашиваем в JWT, что нам нужно дальше для enable-trading:
     jwt_payload = {
@@ -439,18 +479,18 @@ async def set_wallet(
     
     Keeping this endpoint for backward compatibility, but it will be removed in the future.
     """
-    print(f"[Set Wallet] DEPRECATED: This endpoint should not be used anymore")
-    print(f"[Set Wallet] Wallet address should be set during authentication")
+    logger.warning("[Set Wallet] DEPRECATED: This endpoint should not be used anymore")
+    logger.debug("[Set Wallet] Wallet address should be set during authentication")
     
     # Normalize wallet address
     wallet_address = payload.wallet_address.lower()
     
     # Update user's wallet address (for backward compatibility only)
     current_user.wallet_address = wallet_address
-    db.commit()
-    db.refresh(current_user)
+    await run_blocking(db.commit)
+    await run_blocking(db.refresh, current_user)
     
-    print(f"[Set Wallet] ✅ Wallet address updated (deprecated endpoint): {current_user.wallet_address}")
+    logger.debug("[Set Wallet] Wallet address updated (deprecated endpoint): %s", current_user.wallet_address)
     
     return {
         "status": "success",
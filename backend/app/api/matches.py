@@ -1,15 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List, Optional
+import base64
+import json
+import logging
+import time
+from collections import OrderedDict
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import or_, tuple_
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, joinedload, selectinload
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from datetime import datetime
-from app.core.database import get_db
+from app.core.bulk import chunked, insert_on_conflict, inserted_flag
+from app.core.concurrency import run_blocking
+from app.core.config import settings
+from app.core.database import get_db, SessionLocal
+from app.core.ingest import RecordError, describe_validation_error, iter_lines, parse_csv, parse_csv_header, parse_ndjson
+from app.core.timing import TimedRoute
 from app.api.auth import get_current_user
 from app.models.user import User
 from app.models.match import Match
-from app.models.polymarket_market import PolymarketMarket
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=TimedRoute)
+
+# Columns an import may change on an existing match (rescheduled / re-labelled games)
+MATCH_RESCHEDULE_COLUMNS = ("start_time", "league")
 
 class MatchCreate(BaseModel):
     external_id: str
@@ -47,66 +64,269 @@ class PolymarketMarketResponse(BaseModel):
 class MatchDetailResponse(MatchResponse):
     polymarket_markets: List[PolymarketMarketResponse] = []
 
+class MatchListItem(MatchResponse):
+    # Only set (and only serialized) with ?include=markets
+    polymarket_markets: Optional[List[PolymarketMarketResponse]] = None
+
+def _dedupe(matches: Iterable[MatchCreate]) -> "OrderedDict[str, MatchCreate]":
+    """Last occurrence of each external_id wins (a later line is a newer schedule)"""
+    unique: "OrderedDict[str, MatchCreate]" = OrderedDict()
+    for match in matches:
+        unique.pop(match.external_id, None)
+        unique[match.external_id] = match
+    return unique
+
+
+def upsert_matches(db: Session, matches: Sequence[MatchCreate]) -> Dict[str, int]:
+    """
+    Insert new matches and move rescheduled ones (start_time/league) in one
+    INSERT ... ON CONFLICT (external_id) ... RETURNING, then commit
+
+    inserted/updated are only reported where the dialect can tell them apart.
+    """
+    flag = inserted_flag(db)
+    stmt = insert_on_conflict(
+        db, Match.__table__, conflict_columns=["external_id"], update_columns=MATCH_RESCHEDULE_COLUMNS,
+    ).returning(Match.__table__.c.id, *([flag] if flag is not None else []))
+    written = db.execute(stmt, [match.model_dump() for match in matches]).all()
+    db.commit()
+
+    summary = {"received": len(matches), "written": len(written), "unchanged": len(matches) - len(written)}
+    if flag is not None:
+        summary["inserted"] = sum(1 for row in written if row.inserted)
+        summary["updated"] = len(written) - summary["inserted"]
+    return summary
+
+
+def _import_progress(matches: Sequence[MatchCreate], chunk_size: int) -> Iterator[str]:
+    """NDJSON: one line per committed chunk, then the totals"""
+    started = time.perf_counter()
+    unique = _dedupe(matches)
+    totals = {"received": len(matches), "duplicates": len(matches) - len(unique)}
+    # Own session: the request's get_db session is closed before a streamed body is sent
+    db = SessionLocal()
+    try:
+        for number, chunk in enumerate(chunked(unique.values(), chunk_size), start=1):
+            try:
+                summary = upsert_matches(db, chunk)
+            except SQLAlchemyError as e:
+                db.rollback()
+                logger.exception("Match import failed in chunk %d", number)
+                yield json.dumps({"chunk": number, "error": type(e).__name__, **totals, "done": False}) + "\n"
+                return
+            for key, value in summary.items():
+                if key != "received":
+                    totals[key] = totals.get(key, 0) + value
+            yield json.dumps({"chunk": number, **summary}) + "\n"
+    finally:
+        db.close()
+    totals["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    yield json.dumps({**totals, "done": True}) + "\n"
+
+
 @router.post("/import")
-async def import_matches(
+def import_matches(
     request: MatchImportRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
 ):
-    """Import matches from external source"""
-    imported = []
-    for match_data in request.matches:
-        # Check if match already exists
-        existing = db.query(Match).filter(Match.external_id == match_data.external_id).first()
-        if existing:
-            imported.append(existing)
+    """
+    Import matches from external source
+
+    New external_ids are inserted; known ones get start_time/league updated if
+    they changed (rescheduled games). Streams an NDJSON summary per chunk of
+    MATCH_IMPORT_CHUNK_SIZE; each chunk is committed on its own.
+    """
+    return StreamingResponse(
+        _import_progress(request.matches, settings.MATCH_IMPORT_CHUNK_SIZE),
+        media_type="application/x-ndjson",
+    )
+
+def _upsert_chunk(matches: Sequence[MatchCreate]) -> Dict[str, int]:
+    db = SessionLocal()
+    try:
+        return upsert_matches(db, matches)
+    finally:
+        db.close()
+
+
+@router.post("/import/stream")
+async def import_matches_stream(
+    request: Request,
+    body_format: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv)$"),
+    after_line: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Import matches from an NDJSON or CSV body, parsed while it is uploaded
+
+    The format comes from ?format= or the Content-Type (text/csv, else NDJSON);
+    CSV needs a header line with the MatchCreate field names. Valid records are
+    upserted like POST /import in chunks of MATCH_IMPORT_CHUNK_SIZE, so memory
+    holds one chunk regardless of body size. Invalid lines are reported
+    (line number and reason) and skipped.
+
+    Every line up to committed_through_line has been written or reported; after
+    a failure, send the same body again with ?after_line=<committed_through_line>
+    to continue (re-sending committed lines is harmless, the upsert is idempotent).
+    """
+    started = time.perf_counter()
+    if body_format is None:
+        body_format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+
+    totals = {"lines": 0, "received": 0, "duplicates": 0, "written": 0, "unchanged": 0}
+    errors: List[Dict[str, Any]] = []
+    error_count = 0
+    pending: "OrderedDict[str, MatchCreate]" = OrderedDict()
+    committed_through = after_line
+    header: Optional[List[str]] = None
+
+    def record_error(line: int, message: str) -> None:
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < settings.MATCH_IMPORT_MAX_ERRORS:
+            errors.append({"line": line, "error": message})
+
+    def summary(**extra) -> Dict[str, Any]:
+        return {
+            **totals,
+            "error_count": error_count,
+            "errors": errors,
+            "committed_through_line": committed_through,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            **extra,
+        }
+
+    async def flush(through_line: int) -> Optional[JSONResponse]:
+        nonlocal committed_through
+        try:
+            written = await run_blocking(_upsert_chunk, list(pending.values()))
+        except SQLAlchemyError as e:
+            logger.exception("Streaming match import failed after line %d", committed_through)
+            return JSONResponse(status_code=503, content=summary(done=False, error=type(e).__name__))
+        pending.clear()
+        for key, value in written.items():
+            if key != "received":
+                totals[key] = totals.get(key, 0) + value
+        committed_through = through_line
+        return None
+
+    async for number, line in iter_lines(request.stream(), settings.MATCH_IMPORT_MAX_LINE_BYTES):
+        totals["lines"] = number
+        if line is None:
+            record_error(number, f"line longer than {settings.MATCH_IMPORT_MAX_LINE_BYTES} bytes")
             continue
-        
-        match = Match(
-            external_id=match_data.external_id,
-            home_team=match_data.home_team,
-            away_team=match_data.away_team,
-            start_time=match_data.start_time,
-            league=match_data.league,
-            sport=match_data.sport
-        )
-        db.add(match)
-        imported.append(match)
-    
-    db.commit()
-    return {"imported": len(imported), "matches": [MatchResponse.from_orm(m) for m in imported]}
+        if body_format == "csv" and header is None:
+            header = parse_csv_header(line)
+            missing = [name for name in MatchCreate.model_fields if name not in header]
+            if missing:
+                raise HTTPException(status_code=400, detail=f"CSV header is missing: {', '.join(missing)}")
+            continue
+        if number <= after_line or not line.strip():
+            continue
+        try:
+            record = parse_csv(line, header) if body_format == "csv" else parse_ndjson(line)
+            match = MatchCreate.model_validate(record)
+        except RecordError as e:
+            record_error(number, str(e))
+            continue
+        except ValidationError as e:
+            record_error(number, describe_validation_error(e))
+            continue
+
+        totals["received"] += 1
+        # Dedupe within the chunk; a repeat in a later chunk is simply upserted again
+        if pending.pop(match.external_id, None) is not None:
+            totals["duplicates"] += 1
+        pending[match.external_id] = match
+        if len(pending) >= settings.MATCH_IMPORT_CHUNK_SIZE:
+            failed = await flush(number)
+            if failed is not None:
+                return failed
+
+    if pending:
+        failed = await flush(totals["lines"])
+        if failed is not None:
+            return failed
+    committed_through = max(committed_through, totals["lines"])
+    return summary(done=True)
+
+def encode_cursor(match: Match) -> str:
+    raw = json.dumps([match.start_time.isoformat(), match.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
 
-@router.get("/", response_model=List[MatchResponse])
-async def get_matches(
-    skip: int = 0,
-    limit: int = 100,
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        start_time, match_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(start_time), int(match_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/", response_model=List[MatchListItem], response_model_exclude_unset=True)
+def get_matches(
+    response: Response,
+    league: Optional[str] = None,
+    sport: Optional[str] = None,
+    team: Optional[str] = Query(None, description="Home or away team"),
+    start_from: Optional[datetime] = Query(None, description="start_time >= start_from"),
+    start_to: Optional[datetime] = Query(None, description="start_time < start_to"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=500),
+    include: Optional[str] = Query(None, pattern="^markets$", description="'markets' adds each match's Polymarket markets"),
     db: Session = Depends(get_db)
 ):
-    """Get list of matches"""
-    matches = db.query(Match).offset(skip).limit(limit).all()
-    return [MatchResponse.from_orm(m) for m in matches]
+    """
+    Get list of matches ordered by (start_time, id)
+
+    Keyset pagination: if there are more rows, the X-Next-Cursor response
+    header holds the cursor for the next page (same filters). With no filter
+    or one of league, sport, start_from/start_to, pages are read in order from
+    a (column, start_time, id) index. team (home OR away) combines two index
+    scans and sorts them, and league + sport together scan one index and
+    filter on the other column.
+
+    With include=markets the markets of the whole page are loaded by one
+    extra SELECT ... WHERE match_id IN (...), not one query per match.
+    """
+    query = db.query(Match)
+    if include == "markets":
+        query = query.options(selectinload(Match.polymarket_markets))
+    if league is not None:
+        query = query.filter(Match.league == league)
+    if sport is not None:
+        query = query.filter(Match.sport == sport)
+    if team is not None:
+        query = query.filter(or_(Match.home_team == team, Match.away_team == team))
+    if start_from is not None:
+        query = query.filter(Match.start_time >= start_from)
+    if start_to is not None:
+        query = query.filter(Match.start_time < start_to)
+    if cursor is not None:
+        query = query.filter(tuple_(Match.start_time, Match.id) > tuple_(*decode_cursor(cursor)))
+
+    # One extra row tells whether there is a next page
+    matches = query.order_by(Match.start_time, Match.id).limit(limit + 1).all()
+    if len(matches) > limit:
+        matches = matches[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(matches[-1])
+    if include == "markets":
+        return matches
+    # MatchResponse leaves polymarket_markets unset (and unloaded), so it is not serialized
+    return [MatchResponse.model_validate(m) for m in matches]
 
 @router.get("/{match_id}", response_model=MatchDetailResponse)
-async def get_match(
+def get_match(
     match_id: int,
     db: Session = Depends(get_db)
 ):
-    """Get match details with Polymarket markets"""
-    match = db.query(Match).filter(Match.id == match_id).first()
+    """Get match details with Polymarket markets (one query: markets are joined in)"""
+    match = (
+        db.query(Match)
+        .options(joinedload(Match.polymarket_markets))
+        .filter(Match.id == match_id)
+        .first()
+    )
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
-    
-    markets = db.query(PolymarketMarket).filter(PolymarketMarket.match_id == match_id).all()
-    
-    return MatchDetailResponse(
-        id=match.id,
-        external_id=match.external_id,
-        home_team=match.home_team,
-        away_team=match.away_team,
-        start_time=match.start_time,
-        league=match.league,
-        sport=match.sport,
-        created_at=match.created_at,
-        polymarket_markets=[PolymarketMarketResponse.from_orm(m) for m in markets]
-    )
-
+    return match
@@ -0,0 +1,131 @@
+import asyncio
+import json
+from typing import Any, List, Optional, Tuple
+
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.timing import TimedRoute
+from app.polymarket.stream_hub import stream_hub, TOKEN, EVENT
+
+router = APIRouter(route_class=TimedRoute)
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def _parse_ws_message(text: str) -> Tuple[str, List[str], List[str]]:
+    """(op, tokenIds, eventSlugs) from a client message; ValueError with a client-facing reason"""
+    try:
+        message: Any = json.loads(text)
+    except ValueError:
+        raise ValueError("Invalid JSON") from None
+    if not isinstance(message, dict):
+        raise ValueError("Expected a JSON object")
+    op = message.get("op", "subscribe")
+    if op not in ("subscribe", "unsubscribe"):
+        raise ValueError('op must be "subscribe" or "unsubscribe"')
+    ids = []
+    for field in ("tokenIds", "eventSlugs"):
+        value = message.get(field)
+        if value is None:
+            value = []
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise ValueError(f"{field} must be a list of strings")
+        ids.append(value)
+    return op, ids[0], ids[1]
+
+
+@router.get("/sse")
+async def stream_sse(
+    request: Request,
+    tokenIds: Optional[str] = None,
+    eventSlugs: Optional[str] = None
+):
+    """
+    Server-Sent Events stream of live prices
+
+    ?tokenIds=a,b pushes top-of-book updates ("book" events),
+    ?eventSlugs=x,y pushes event market price updates ("market" events).
+    Slow clients only receive the latest update per token/event.
+    """
+    subscriber = stream_hub.connect()
+    rejected = stream_hub.subscribe(subscriber, _split(tokenIds), _split(eventSlugs))
+
+    async def events():
+        try:
+            if rejected:
+                yield f"event: rejected\ndata: {json.dumps(rejected)}\n\n"
+            while not await request.is_disconnected():
+                batch = await subscriber.next_batch(timeout=settings.STREAM_KEEPALIVE_INTERVAL)
+                if not batch:
+                    # Keepalive comment so proxies do not close an idle stream
+                    yield ": ping\n\n"
+                    continue
+                for update in batch:
+                    yield f"event: {update['type']}\ndata: {json.dumps(update)}\n\n"
+        finally:
+            stream_hub.disconnect(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def stream_websocket(websocket: WebSocket):
+    """
+    WebSocket stream of live prices
+
+    Client messages: {"op": "subscribe" | "unsubscribe", "tokenIds": [...], "eventSlugs": [...]}
+    Server messages: {"type": "book" | "market", ...} updates, {"type": "rejected", "ids": [...]},
+    {"type": "error", "detail": "..."} for a malformed client message (the socket stays open)
+    """
+    await websocket.accept()
+    subscriber = stream_hub.connect()
+
+    async def receive():
+        while True:
+            try:
+                op, token_ids, event_slugs = _parse_ws_message(await websocket.receive_text())
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            if op == "unsubscribe":
+                stream_hub.unsubscribe(
+                    subscriber,
+                    [(TOKEN, token_id) for token_id in token_ids] + [(EVENT, slug) for slug in event_slugs],
+                )
+            else:
+                rejected = stream_hub.subscribe(subscriber, token_ids, event_slugs)
+                if rejected:
+                    await websocket.send_json({"type": "rejected", "ids": rejected})
+
+    async def send():
+        while True:
+            batch = await subscriber.next_batch(timeout=settings.STREAM_KEEPALIVE_INTERVAL)
+            for update in batch or [{"type": "ping"}]:
+                await websocket.send_json(update)
+
+    receiver = asyncio.ensure_future(receive())
+    sender = asyncio.ensure_future(send())
+    try:
+        done, _ = await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            exc = task.exception()
+            if exc is not None and not isinstance(exc, WebSocketDisconnect):
+                raise exc
+    finally:
+        receiver.cancel()
+        sender.cancel()
+        stream_hub.disconnect(subscriber)
+
+
+@router.get("/stats")
+async def stream_stats():
+    """Streaming connections and fan-out counters"""
+    return stream_hub.stats()
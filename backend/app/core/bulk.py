@@ -0,0 +1,71 @@
+"""
+Dialect-specific INSERT ... ON CONFLICT for bulk writes
+
+PostgreSQL (production) and SQLite (local dev) both support ON CONFLICT and
+RETURNING with the same SQLAlchemy API; other backends are not supported.
+"""
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, TypeVar
+
+from sqlalchemy import Table, literal_column, or_
+from sqlalchemy.orm import Session
+
+T = TypeVar("T")
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    chunk: List[T] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert(db: Session, table: Table):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT upsert is not supported for {dialect}")
+    return insert(table)
+
+
+def insert_on_conflict(
+    db: Session,
+    table: Table,
+    conflict_columns: Sequence[str],
+    update_columns: Sequence[str] = (),
+):
+    """
+    INSERT that on a `conflict_columns` conflict either does nothing or updates
+    `update_columns`, but only when one of them changes (so unchanged rows are
+    neither rewritten nor returned by RETURNING)
+
+    Execute it with a list of row dicts: SQLAlchemy's "insertmanyvalues" sends
+    them as multi-row VALUES batches (RETURNING included), and the statement
+    stays in the compiled cache whatever the batch size.
+    """
+    stmt = _insert(db, table)
+    if not update_columns:
+        return stmt.on_conflict_do_nothing(index_elements=list(conflict_columns))
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=list(conflict_columns),
+        set_={column: excluded[column] for column in update_columns},
+        where=or_(*(table.c[column] != excluded[column] for column in update_columns)),
+    )
+
+
+def inserted_flag(db: Session) -> Optional[Any]:
+    """
+    RETURNING expression that is true for inserted (not updated) rows, or None
+    if the dialect cannot tell them apart (SQLite)
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # xmax is 0 for a row version created by INSERT, the locking xid after ON CONFLICT DO UPDATE
+        return literal_column("(xmax = 0)").label("inserted")
+    return None
@@ -0,0 +1,159 @@
+"""
+In-process caches for upstream lookups
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at")
+
+    def __init__(self, value: Any, stored_at: float):
+        self.value = value
+        self.stored_at = stored_at
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with TTL, stale-while-revalidate and single-flight loads
+
+    - Entries younger than `ttl` are served directly (hit)
+    - Entries younger than `ttl + stale_ttl` are served immediately while a
+      background refresh is scheduled (stale hit)
+    - Older or missing entries are loaded inline (miss); concurrent misses for
+      the same key share one loader call
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0.0, max_size: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, "asyncio.Task"] = {}
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.load_errors = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh value for key, or None (does not count towards stats)"""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.stored_at >= self.ttl:
+            return None
+        return entry.value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return the stored value for key regardless of age (last-resort fallback)"""
+        entry = self._entries.get(key)
+        return entry.value if entry is not None else None
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """Seconds since the value for key was stored, or None if there is none"""
+        entry = self._entries.get(key)
+        return time.monotonic() - entry.stored_at if entry is not None else None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        # pop + insert keeps the key last without a move_to_end that could race with invalidate()
+        self._entries.pop(key, None)
+        self._entries[key] = _Entry(value, time.monotonic())
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop key; a load already in flight for it will not be stored"""
+        self._entries.pop(key, None)
+        self._inflight.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """invalidate() every stored or loading key matching predicate"""
+        matching = [key for key in self._entries if predicate(key)]
+        matching += [key for key in self._inflight if predicate(key)]
+        for key in matching:
+            self.invalidate(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._inflight.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return cached value for key, calling `loader` on miss or scheduling it when stale"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self.refreshes += 1
+                    self._start_load(key, loader, background=True)
+                return entry.value
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = self._start_load(key, loader, background=False)
+        # shield: a cancelled caller must not cancel the load shared with others
+        return await asyncio.shield(task)
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], background: bool) -> "asyncio.Task":
+        async def run():
+            try:
+                value = await loader()
+            except Exception:
+                if background:
+                    self.refresh_errors += 1
+                else:
+                    self.load_errors += 1
+                raise
+            finally:
+                # Not current any more if invalidated (or superseded) while loading
+                current = self._inflight.get(key) is task
+                if current:
+                    del self._inflight[key]
+            if current:
+                self.set(key, value)
+            return value
+
+        task = asyncio.ensure_future(run())
+        self._inflight[key] = task
+        # Retrieve the exception so unobserved background failures are not logged as never retrieved
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "load_errors": self.load_errors,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight),
+            "hit_ratio": ((self.hits + self.stale_hits) / lookups) if lookups else 0.0,
+        }
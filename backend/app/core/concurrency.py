@@ -0,0 +1,32 @@
+"""
+Offloading of blocking work (sync SQLAlchemy sessions, py_clob_client calls)
+from the event loop to a bounded worker thread pool
+"""
+import functools
+from typing import Any, Callable, TypeVar
+
+from anyio import to_thread
+
+from app.core.config import settings
+from app.core.profiling import active_profiler
+
+T = TypeVar("T")
+
+
+def configure_threadpool() -> None:
+    """
+    Size the shared worker thread pool
+
+    FastAPI runs sync dependencies (get_db) and `def` routes
+    on the same anyio default limiter, so one setting bounds all blocking work.
+    """
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_MAX_WORKERS
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking callable in the worker thread pool and await its result"""
+    call = functools.partial(func, *args, **kwargs)
+    profiler = active_profiler()
+    if profiler is not None:
+        call = profiler.track_thread(call)
+    return await to_thread.run_sync(call)
@@ -6,6 +6,8 @@ class Settings(BaseSettings):
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRE_MIN: int = 1440
+    JWT_CACHE_ENABLED: bool = True  # cache decoded tokens (skip re-verifying the same bearer token)
+    JWT_CACHE_SIZE: int = 4096
     
     # Polymarket settings
     POLY_CLOB_HOST: str = "https://clob.polymarket.com"
@@ -15,12 +17,122 @@ class Settings(BaseSettings):
     POLY_BUILDER_SECRET: str
     POLY_BUILDER_PASSPHRASE: str
     POLY_BUILDER_PRIVATE_KEY: str
+    POLY_CLOB_WS_URL: str = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+    POLY_FEE_RATE_BPS: int = 0  # taker fee rate used for order previews
     
     # Privy settings
     PRIVY_APP_ID: Optional[str] = None
     PRIVY_APP_SECRET: Optional[str] = None
     PRIVY_API_URL: str = "https://auth.privy.io/api/v1"
-    
+
+    POLY_GAMMA_API_URL: str = "https://gamma-api.polymarket.com"
+
+    # Logging (app.* loggers): DEBUG restores the per-request request/response dumps
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # "text" or "json"
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0  # fraction of DEBUG records kept per call site
+    LOG_QUEUE_SIZE: int = 10000
+
+    # In-process Prometheus metrics (GET /metrics): HTTP, upstream and DB timings
+    METRICS_ENABLED: bool = True
+    # Server-Timing header (auth/db/upstream/app/serialize); db and upstream need METRICS_ENABLED
+    SERVER_TIMING_ENABLED: bool = True
+    # Per-request sampling profiler: requests to PROFILING_PATHS (comma separated) with
+    # header X-Profile-Token = PROFILING_TOKEN are profiled; unset token = disabled
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_PATHS: str = "/api/polymarket/orders/confirm,/api/polymarket/enable-trading/confirm"
+    PROFILING_INTERVAL: float = 0.001
+    PROFILING_DIR: Optional[str] = None  # default: <tmp>/marketsport-profiles
+
+    # Shared upstream HTTP clients (pool limits, timeouts in seconds)
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP2_ENABLED: bool = True
+    GAMMA_HTTP_TIMEOUT: float = 10.0
+    CLOB_HTTP_TIMEOUT: float = 10.0
+    PRIVY_HTTP_TIMEOUT: float = 10.0
+    RELAYER_HTTP_TIMEOUT: float = 10.0
+
+    # Upstream resilience: retries (idempotent only), hedging, circuit breakers
+    UPSTREAM_RETRY_ATTEMPTS: int = 2
+    UPSTREAM_RETRY_BACKOFF: float = 0.2
+    UPSTREAM_RETRY_BACKOFF_MAX: float = 2.0
+    UPSTREAM_HEDGE_ENABLED: bool = True
+    UPSTREAM_HEDGE_MIN_DELAY: float = 0.3
+    UPSTREAM_BREAKER_FAILURES: int = 5
+    UPSTREAM_BREAKER_RESET: float = 30.0
+
+    # Authenticated user cache (get_current_user), seconds
+    USER_CACHE_TTL: float = 30.0
+    USER_CACHE_MAX_SIZE: int = 10000
+
+    # SIWE nonces: "database" (shared by all workers) or "memory" (single worker only)
+    NONCE_STORE_BACKEND: str = "database"
+    NONCE_TTL: float = 300.0
+
+    # Signature recovery pool: "process", "thread" or "inline"; 0 workers = CPU count
+    SIGNATURE_POOL: str = "process"
+    SIGNATURE_POOL_WORKERS: int = 0
+
+    # SQLAlchemy connection pool (PostgreSQL); size + overflow should cover
+    # THREADPOOL_MAX_WORKERS, since every worker thread may hold a session
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 10.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds; reconnect before server/proxy idle limits
+    DB_POOL_PRE_PING: bool = True  # detect connections killed by a Postgres restart
+    DB_STATEMENT_TIMEOUT_MS: int = 15000  # per connection; 0 = no limit
+
+    # Worker threads for blocking work (sync DB sessions, py_clob_client) per process
+    THREADPOOL_MAX_WORKERS: int = 40
+
+    # Market lookup cache (GET /api/polymarket/market), seconds
+    MARKET_CACHE_TTL: float = 5.0
+    MARKET_CACHE_STALE_TTL: float = 30.0
+    MARKET_CACHE_MAX_SIZE: int = 2048
+    MARKET_BATCH_MAX_SLUGS: int = 50
+    MARKET_BATCH_CONCURRENCY: int = 8
+
+    # Balance/allowance cache (GET /api/polymarket/balance), per user and asset, seconds
+    BALANCE_CACHE_TTL: float = 3.0
+    BALANCE_CACHE_MAX_SIZE: int = 10000
+    # GET /api/polymarket/portfolio: tokens per request, concurrent balance calls,
+    # /data/trades pages scanned for held tokens
+    PORTFOLIO_MAX_TOKENS: int = 100
+    PORTFOLIO_CONCURRENCY: int = 8
+    PORTFOLIO_MAX_TRADE_PAGES: int = 5
+
+    # POST /api/matches/import: rows per INSERT ... ON CONFLICT statement (and commit)
+    MATCH_IMPORT_CHUNK_SIZE: int = 500
+    # POST /api/matches/import/stream: longest accepted line, errors listed in the summary
+    MATCH_IMPORT_MAX_LINE_BYTES: int = 65536
+    MATCH_IMPORT_MAX_ERRORS: int = 1000
+
+    # Background market snapshot refresher, seconds
+    MARKET_SNAPSHOT_ENABLED: bool = True
+    MARKET_SNAPSHOT_TICK: float = 1.0
+    MARKET_SNAPSHOT_LIVE_WINDOW: float = 3600.0
+    MARKET_SNAPSHOT_INTERVAL_LIVE: float = 5.0
+    MARKET_SNAPSHOT_INTERVAL_SOON: float = 30.0
+    MARKET_SNAPSHOT_INTERVAL_FAR: float = 300.0
+    MARKET_SNAPSHOT_RETENTION: float = 12 * 3600.0
+    MARKET_SNAPSHOT_DB_SYNC_INTERVAL: float = 60.0
+    MARKET_SNAPSHOT_TOKEN_CHUNK: int = 50
+
+    # Order book engine (CLOB market websocket), seconds
+    ORDERBOOK_WS_ENABLED: bool = True
+    ORDERBOOK_IDLE_TTL: float = 60.0
+    ORDERBOOK_SNAPSHOT_WAIT: float = 2.0
+    ORDERBOOK_MAX_TOKENS: int = 500
+    ORDERBOOK_WS_PING_INTERVAL: float = 10.0
+    ORDERBOOK_WS_TICK: float = 1.0
+
+    # Live price streaming (SSE / WebSocket) to clients
+    STREAM_MAX_KEYS_PER_CONNECTION: int = 100
+    STREAM_KEEPALIVE_INTERVAL: float = 15.0
+
     class Config:
         env_file = ".env"
         case_sensitive = True
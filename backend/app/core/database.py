@@ -1,9 +1,33 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import InstrumentedQueuePool, instrument_engine
 
-engine = create_engine(settings.DATABASE_URL)
+
+def _engine_kwargs(url: str) -> dict:
+    """Pool and session settings; SQLite (local dev) keeps SQLAlchemy's defaults"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    kwargs = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.METRICS_ENABLED:
+        kwargs["poolclass"] = InstrumentedQueuePool
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        # Sent with the connection startup packet: no extra round trip per checkout
+        kwargs["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return kwargs
+
+
+engine = create_engine(settings.DATABASE_URL, **_engine_kwargs(settings.DATABASE_URL))
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -14,4 +38,3 @@ def get_db():
         yield db
     finally:
         db.close()
-
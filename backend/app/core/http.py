@@ -0,0 +1,110 @@
+"""
+Shared pooled HTTP clients for upstream APIs (Gamma, CLOB, Privy, relayer)
+
+One client per upstream host, created in the FastAPI lifespan hook and reused
+for every request so TCP/TLS connections are kept alive between calls. With
+METRICS_ENABLED the transports record latency and status per upstream.
+"""
+import logging
+from typing import Dict
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import InstrumentedSyncTransport, InstrumentedTransport
+
+logger = logging.getLogger(__name__)
+
+GAMMA = "gamma"
+CLOB = "clob"
+PRIVY = "privy"
+RELAYER = "relayer"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _upstream_timeouts() -> Dict[str, float]:
+    return {
+        GAMMA: settings.GAMMA_HTTP_TIMEOUT,
+        CLOB: settings.CLOB_HTTP_TIMEOUT,
+        PRIVY: settings.PRIVY_HTTP_TIMEOUT,
+        RELAYER: settings.RELAYER_HTTP_TIMEOUT,
+    }
+
+
+class UpstreamClients:
+    """Registry of pooled httpx clients keyed by upstream name"""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._sync_clients: Dict[str, httpx.Client] = {}
+
+    def _client_kwargs(self, name: str) -> dict:
+        timeouts = _upstream_timeouts()
+        if name not in timeouts:
+            raise KeyError(f"Unknown upstream: {name}")
+        return {
+            "timeout": httpx.Timeout(timeouts[name], connect=settings.HTTP_CONNECT_TIMEOUT),
+            "follow_redirects": True,
+        }
+
+    def _transport_kwargs(self) -> dict:
+        return {
+            "limits": httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            "http2": settings.HTTP2_ENABLED and _http2_available(),
+        }
+
+    def _transport(self, name: str) -> httpx.AsyncBaseTransport:
+        transport = httpx.AsyncHTTPTransport(**self._transport_kwargs())
+        return InstrumentedTransport(transport, name) if settings.METRICS_ENABLED else transport
+
+    def _sync_transport(self, name: str) -> httpx.BaseTransport:
+        transport = httpx.HTTPTransport(**self._transport_kwargs())
+        return InstrumentedSyncTransport(transport, name) if settings.METRICS_ENABLED else transport
+
+    async def startup(self) -> None:
+        for name in _upstream_timeouts():
+            self.get(name)
+        logger.info("Upstream HTTP clients started: %s", ", ".join(self._clients))
+
+    async def shutdown(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        for client in self._sync_clients.values():
+            client.close()
+        self._clients.clear()
+        self._sync_clients.clear()
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """Async client for upstream `name` (created lazily outside the app lifespan)"""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(transport=self._transport(name), **self._client_kwargs(name))
+            self._clients[name] = client
+        return client
+
+    def get_sync(self, name: str) -> httpx.Client:
+        """
+        Blocking client for upstream `name`
+
+        Only for call sites that must stay synchronous (e.g. the py_clob_client
+        Signer interface); everything else should use get().
+        """
+        client = self._sync_clients.get(name)
+        if client is None or client.is_closed:
+            client = httpx.Client(transport=self._sync_transport(name), **self._client_kwargs(name))
+            self._sync_clients[name] = client
+        return client
+
+
+upstreams = UpstreamClients()
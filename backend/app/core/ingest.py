@@ -0,0 +1,81 @@
+"""
+Incremental parsing of line-oriented request bodies (NDJSON, CSV)
+
+Records are produced while the body is still arriving, so memory stays at
+one line (bounded by max_line_bytes) plus whatever the caller buffers.
+"""
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+
+class RecordError(ValueError):
+    """A single line could not be parsed; the rest of the body is still read"""
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, Optional[str]]]:
+    """
+    (line number, text) for every line of a UTF-8 body, numbered from 1
+
+    A line longer than max_line_bytes (raw bytes, before decoding) comes out
+    as (number, None) and is skipped up to its newline instead of being
+    buffered. Splitting on b"\\n" is safe: it never occurs inside a multi-byte
+    UTF-8 sequence.
+    """
+    pending = b""
+    number = 0
+    overlong = False
+    async for chunk in chunks:
+        pending += chunk
+        if b"\n" in pending:
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                number += 1
+                if overlong or len(line) > max_line_bytes:
+                    overlong = False
+                    yield number, None
+                else:
+                    yield number, _decode_line(line, number)
+        if len(pending) > max_line_bytes:
+            overlong = True
+            pending = b""
+    if overlong or len(pending) > max_line_bytes:
+        yield number + 1, None
+    elif pending:
+        yield number + 1, _decode_line(pending, number + 1)
+
+
+def _decode_line(line: bytes, number: int) -> str:
+    text = line.decode("utf-8", errors="replace").rstrip("\r")
+    return text.removeprefix("\ufeff") if number == 1 else text
+
+
+def parse_ndjson(line: str) -> Dict[str, Any]:
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise RecordError(f"invalid JSON: {e.msg}") from None
+    if not isinstance(record, dict):
+        raise RecordError("expected a JSON object")
+    return record
+
+
+def parse_csv_header(line: str) -> List[str]:
+    return [name.strip() for name in next(csv.reader([line]))]
+
+
+def parse_csv(line: str, header: List[str]) -> Dict[str, Any]:
+    """One record per line (quoted fields may not contain newlines)"""
+    values = next(csv.reader([line]))
+    if len(values) != len(header):
+        raise RecordError(f"expected {len(header)} fields, got {len(values)}")
+    return dict(zip(header, values))
+
+
+def describe_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'record'}: {item['msg']}"
+        for item in error.errors()
+    )
@@ -0,0 +1,173 @@
+"""
+Application logging: leveled, text or JSON output written off the event loop
+
+configure_logging() puts a QueueHandler on the root logger, so a log call only
+formats its message and enqueues the record; a QueueListener thread redacts
+credentials and writes to stderr. Records below LOG_LEVEL cost one level
+check (use %-style arguments, not f-strings, to keep that true).
+
+High-volume DEBUG lines are sampled per call site: LOG_DEBUG_SAMPLE_RATE for
+all of them, or `extra={"sample_every": N}` for a single line.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import threading
+from collections.abc import Mapping
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+REDACTED = "[REDACTED]"
+
+_SECRET_KEYS = r"passphrase|secret|signature|api[_-]?key|private[_-]?key|access[_-]?token|authorization"
+_SECRET_KEY_RE = re.compile(_SECRET_KEYS, re.IGNORECASE)
+
+_REDACT_PATTERNS = (
+    re.compile(r"(?i)(bearer\s+)[\w\-.=]+"),
+    # key=value / "key": "value" for credential-like keys (POLY_PASSPHRASE, api_secret, POLY_SIGNATURE, ...)
+    re.compile(
+        rf"(?i)((?:{_SECRET_KEYS})"
+        r"['\"]?\s*[:=]\s*['\"]?)([^'\"\s,}]+)"
+    ),
+    # 65-byte hex signatures
+    re.compile(r"()0x[0-9a-fA-F]{130}"),
+)
+
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "sample_every"}
+
+
+def redact(text: str) -> str:
+    for pattern in _REDACT_PATTERNS:
+        text = pattern.sub(lambda m: m.group(1) + REDACTED, text)
+    return text
+
+
+def redact_value(value: Any) -> Any:
+    """redact() for structured `extra` values: credential-like keys are masked whole"""
+    if isinstance(value, Mapping):
+        return {
+            key: REDACTED if isinstance(key, str) and _SECRET_KEY_RE.search(key) else redact_value(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple, set)):
+        return [redact_value(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return redact(value if isinstance(value, str) else str(value))
+
+
+class RedactingFilter(logging.Filter):
+    """Masks credentials in the (already merged) message and traceback text"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.msg = redact(record.getMessage())
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        if record.exc_text:
+            record.exc_text = redact(record.exc_text)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Passes every Nth DEBUG record per call site; other levels always pass"""
+
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.default_every = max(1, round(1 / sample_rate)) if sample_rate > 0 else 0
+        self._counts: Dict[Tuple[str, int], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        every = getattr(record, "sample_every", None) or self.default_every
+        if every == 1:
+            return True
+        if every == 0:
+            return False
+        site = (record.pathname, record.lineno)
+        count = self._counts.get(site, 0)
+        self._counts[site] = count + 1
+        return count % every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra` fields are included (redacted) as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = REDACTED if _SECRET_KEY_RE.search(key) else redact_value(value)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Merges args in the caller (they may be mutated later) and drops records when the queue is full"""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _QueueHandler.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+def configure_logging() -> None:
+    """Install the queue handler on the root logger (idempotent)"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        output = logging.StreamHandler()
+        if settings.LOG_FORMAT == "json":
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+        output.addFilter(RedactingFilter())
+
+        handler = _QueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+        handler.addFilter(SamplingFilter(settings.LOG_DEBUG_SAMPLE_RATE))
+
+        # Root stays at WARNING so chatty libraries (httpx logs every request at INFO) stay quiet
+        logging.getLogger().addHandler(handler)
+        logging.getLogger("app").setLevel(settings.LOG_LEVEL.upper())
+
+        _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def logging_stats() -> Dict[str, int]:
+    return {"dropped": _QueueHandler.dropped}
@@ -0,0 +1,361 @@
+"""
+In-process metrics in the Prometheus text exposition format (GET /metrics)
+
+Counters, gauges and histograms are plain dicts keyed by label values behind a
+lock (DB events fire on worker threads). Values that other components already
+count (cache hits, breaker state) are read through callbacks at scrape time
+instead of being double-counted.
+
+Instrumented here:
+- HTTP requests per route (MetricsMiddleware)
+- upstream calls per upstream (InstrumentedTransport, wraps the pooled clients)
+- DB queries, total and per request, and pool usage (instrument_engine,
+  InstrumentedQueuePool)
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+from app.core.timing import current_timings
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def _samples(self) -> Dict[LabelValues, float]:
+        if self.callback is not None:
+            return self.callback()
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self._samples().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (+Inf last), sum]
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), total[0]) for labels, (counts, total) in self._series.items()}
+        for labels, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = (), callback=None) -> Counter:
+        return self.register(Counter(name, help_text, labelnames, callback))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames, callback))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+http_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is complete", ("method", "route"))
+http_in_progress = registry.gauge("http_requests_in_progress", "HTTP requests being served")
+http_db_duration = registry.histogram(
+    "http_request_db_duration_seconds", "DB query time spent per HTTP request", ("method", "route"), DB_BUCKETS)
+
+upstream_requests = registry.counter(
+    "upstream_requests_total", "Upstream HTTP calls by status ('error' = transport failure)", ("upstream", "method", "status"))
+upstream_duration = registry.histogram(
+    "upstream_request_duration_seconds", "Upstream HTTP latency until response headers", ("upstream", "method"))
+upstream_in_progress = registry.gauge("upstream_requests_in_progress", "Upstream HTTP calls in flight", ("upstream",))
+
+db_queries = registry.counter("db_queries_total", "SQL statements executed")
+db_errors = registry.counter("db_errors_total", "SQL statements or connects that raised (incl. statement timeouts)")
+db_duration = registry.histogram("db_query_duration_seconds", "SQL statement execution time", (), DB_BUCKETS)
+db_pool_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time waiting for a pooled connection", (), (0.0001,) + DB_BUCKETS + (2.5, 5.0, 10.0, 30.0))
+db_pool_timeouts = registry.counter("db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT")
+
+
+# --- HTTP -----------------------------------------------------------------
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no extra task per request; streaming responses pass through)
+
+    Must run inside RequestTimingMiddleware to get the per-request DB time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        timings = current_timings()
+        http_in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_progress.dec()
+            route = scope.get("route")
+            # Route template (/orders/{order_id}), never the raw path, to bound label cardinality
+            route_label = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests.inc(method, route_label, status)
+            http_duration.observe(elapsed, method, route_label)
+            if timings is not None and timings.db_queries:
+                http_db_duration.observe(timings.db, method, route_label)
+
+
+# --- Upstreams --------------------------------------------------------------
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Times every request of one pooled upstream client"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, upstream: str):
+        self._transport = transport
+        self.upstream = upstream
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        status = "error"
+        upstream_in_progress.inc(self.upstream)
+        started = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            upstream_in_progress.dec(self.upstream)
+            upstream_duration.observe(elapsed, self.upstream, request.method)
+            upstream_requests.inc(self.upstream, request.method, status)
+            timings = current_timings()
+            if timings is not None:
+                timings.add_upstream(elapsed)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class InstrumentedSyncTransport(httpx.BaseTransport):
+    """Blocking counterpart of InstrumentedTransport (UpstreamClients.get_sync)"""
+
+    def __init__(self, transport: httpx.BaseTransport, upstream: str):
+        self._transport = transport
+        self.upstream = upstream
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        status = "error"
+        upstream_in_progress.inc(self.upstream)
+        started = time.perf_counter()
+        try:
+            response = self._transport.handle_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            upstream_in_progress.dec(self.upstream)
+            upstream_duration.observe(elapsed, self.upstream, request.method)
+            upstream_requests.inc(self.upstream, request.method, status)
+            timings = current_timings()
+            if timings is not None:
+                timings.add_upstream(elapsed)
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+# --- Database ---------------------------------------------------------------
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a free connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            db_pool_timeouts.inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            db_pool_wait.observe(elapsed)
+            timings = current_timings()
+            if timings is not None:
+                timings.add_pool_wait(elapsed)
+
+
+def instrument_engine(engine) -> None:
+    """Count and time every statement executed through `engine`; expose its pool usage"""
+
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        registry.gauge("db_pool_size", "Configured pool size + max overflow", (), lambda: {(): capacity})
+        registry.gauge("db_pool_checked_out", "Connections in use", (), lambda: {(): pool.checkedout()})
+        registry.gauge("db_pool_checked_in", "Idle pooled connections", (), lambda: {(): pool.checkedin()})
+        registry.gauge(
+            "db_pool_utilization", "Connections in use / (pool size + max overflow)", (),
+            lambda: {(): pool.checkedout() / capacity if capacity else 0.0},
+        )
+
+    # Start time lives on the execution context, so a failed statement leaves nothing behind
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "metrics_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        db_queries.inc()
+        db_duration.observe(elapsed)
+        timings = current_timings()
+        if timings is not None:
+            timings.add_db(elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        db_errors.inc()
+
+
+# --- Scrape-time values -------------------------------------------------------
+
+def register_cache_stats(caches: Callable[[], Iterable[Tuple[str, Dict[str, Any]]]]) -> None:
+    """
+    Expose hit/miss counters and hit ratio of caches
+
+    `caches` returns (name, stats) pairs; stats needs "hits" and "misses"
+    and may have "stale_hits" (TTLCache.stats()).
+    """
+    def collect(field: str) -> Callable[[], Dict[LabelValues, float]]:
+        return lambda: {(name,): stats.get(field, 0) for name, stats in caches()}
+
+    def ratios() -> Dict[LabelValues, float]:
+        result = {}
+        for name, stats in caches():
+            hits = stats.get("hits", 0) + stats.get("stale_hits", 0)
+            lookups = hits + stats.get("misses", 0)
+            result[(name,)] = hits / lookups if lookups else 0.0
+        return result
+
+    registry.counter("cache_hits_total", "Cache hits (fresh)", ("cache",), collect("hits"))
+    registry.counter("cache_stale_hits_total", "Cache hits served stale while refreshing", ("cache",), collect("stale_hits"))
+    registry.counter("cache_misses_total", "Cache misses", ("cache",), collect("misses"))
+    registry.gauge("cache_hit_ratio", "(hits + stale hits) / lookups since start", ("cache",), ratios)
+    registry.gauge("cache_entries", "Entries currently cached", ("cache",), collect("size"))
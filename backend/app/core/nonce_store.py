@@ -0,0 +1,154 @@
+"""
+SIWE nonce storage for /auth/nonce and /auth/authenticate
+
+- MemoryNonceStore: per-process dict plus an expiry min-heap (O(log n) expiry),
+  only correct with a single worker
+- DatabaseNonceStore: auth_nonces table shared by all workers; nonces are
+  consumed with a conditional DELETE so each can be used exactly once
+"""
+import heapq
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.concurrency import run_blocking
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.auth_nonce import AuthNonce
+
+
+class NonceStore(ABC):
+    """One pending nonce per address, valid for `ttl` seconds"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    @abstractmethod
+    async def issue(self, address: str, nonce: str) -> None:
+        """Store nonce for address, replacing any pending one"""
+
+    @abstractmethod
+    async def get(self, address: str) -> Optional[str]:
+        """Pending, unexpired nonce for address"""
+
+    @abstractmethod
+    async def consume(self, address: str, nonce: str) -> bool:
+        """Atomically remove nonce if it is still pending; False if already used or expired"""
+
+
+class MemoryNonceStore(NonceStore):
+
+    def __init__(self, ttl: float):
+        super().__init__(ttl)
+        self._nonces: Dict[str, Tuple[str, float]] = {}
+        self._expiry_heap: List[Tuple[float, str, str]] = []
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, address, nonce = heapq.heappop(self._expiry_heap)
+            # Heap entries of replaced/consumed nonces are skipped lazily
+            entry = self._nonces.get(address)
+            if entry is not None and entry[0] == nonce:
+                del self._nonces[address]
+
+    async def issue(self, address: str, nonce: str) -> None:
+        self._expire()
+        expires_at = time.monotonic() + self.ttl
+        self._nonces[address] = (nonce, expires_at)
+        heapq.heappush(self._expiry_heap, (expires_at, address, nonce))
+
+    async def get(self, address: str) -> Optional[str]:
+        self._expire()
+        entry = self._nonces.get(address)
+        return entry[0] if entry is not None else None
+
+    async def consume(self, address: str, nonce: str) -> bool:
+        self._expire()
+        entry = self._nonces.get(address)
+        if entry is None or entry[0] != nonce:
+            return False
+        del self._nonces[address]
+        return True
+
+
+class DatabaseNonceStore(NonceStore):
+
+    def __init__(self, ttl: float, cleanup_interval: float = 60.0):
+        super().__init__(ttl)
+        self.cleanup_interval = cleanup_interval
+        self._next_cleanup = 0.0
+
+    async def issue(self, address: str, nonce: str) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        cleanup = time.monotonic() >= self._next_cleanup
+        if cleanup:
+            self._next_cleanup = time.monotonic() + self.cleanup_interval
+        await run_blocking(self._issue, address, nonce, expires_at, cleanup)
+
+    def _issue(self, address: str, nonce: str, expires_at: datetime, cleanup: bool) -> None:
+        db = SessionLocal()
+        try:
+            if cleanup:
+                # Expired rows are only ever read through the expires_at filter;
+                # deleting them in bulk keeps the table small (uses ix_auth_nonces_expires_at)
+                db.query(AuthNonce).filter(AuthNonce.expires_at <= datetime.now(timezone.utc)).delete(synchronize_session=False)
+            db.merge(AuthNonce(address=address, nonce=nonce, expires_at=expires_at))
+            try:
+                db.commit()
+            except IntegrityError:
+                # Concurrent first nonce for the same address inserted the row; overwrite it
+                db.rollback()
+                db.merge(AuthNonce(address=address, nonce=nonce, expires_at=expires_at))
+                db.commit()
+        finally:
+            db.close()
+
+    async def get(self, address: str) -> Optional[str]:
+        return await run_blocking(self._get, address)
+
+    def _get(self, address: str) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            row = (
+                db.query(AuthNonce.nonce)
+                .filter(AuthNonce.address == address, AuthNonce.expires_at > datetime.now(timezone.utc))
+                .first()
+            )
+            return row[0] if row else None
+        finally:
+            db.close()
+
+    async def consume(self, address: str, nonce: str) -> bool:
+        return await run_blocking(self._consume, address, nonce)
+
+    def _consume(self, address: str, nonce: str) -> bool:
+        db = SessionLocal()
+        try:
+            deleted = (
+                db.query(AuthNonce)
+                .filter(
+                    AuthNonce.address == address,
+                    AuthNonce.nonce == nonce,
+                    AuthNonce.expires_at > datetime.now(timezone.utc),
+                )
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return deleted == 1
+        finally:
+            db.close()
+
+
+def create_nonce_store() -> NonceStore:
+    if settings.NONCE_STORE_BACKEND == "memory":
+        return MemoryNonceStore(settings.NONCE_TTL)
+    if settings.NONCE_STORE_BACKEND == "database":
+        return DatabaseNonceStore(settings.NONCE_TTL)
+    raise ValueError(f"Unknown NONCE_STORE_BACKEND: {settings.NONCE_STORE_BACKEND}")
+
+
+nonce_store = create_nonce_store()
@@ -0,0 +1,240 @@
+"""
+Opt-in sampling profiler for single requests
+
+A request to one of PROFILING_PATHS carrying `X-Profile-Token: <PROFILING_TOKEN>`
+is profiled: a sampler thread records a stack every PROFILING_INTERVAL
+seconds while the request is in flight. Each sample is one of:
+
+- the event loop thread's stack, while the request's task is running
+- the stack of a worker thread running run_blocking() work for the request
+- the request task's await chain while it is suspended (waiting on I/O)
+
+so the profile covers wall time, and other requests served concurrently on
+the loop are left out. The report (top functions and collapsed stacks for
+flame graph tools) is written to PROFILING_DIR; the response carries its id
+in X-Profile-Id and GET /debug/profiles/{id} returns it.
+"""
+import asyncio
+import hmac
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TOKEN_HEADER = "x-profile-token"
+ID_HEADER = "x-profile-id"
+
+# Leading frames of worker threads that belong to the pool machinery, not to the request
+_POOL_FRAMES = (os.sep + "threading.py", os.sep + "concurrent" + os.sep, os.sep + "anyio" + os.sep)
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _walk(frame, stop=None) -> List:
+    """Frames from `frame` up to (and including) `stop` or the thread root, innermost first"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        if frame is stop:
+            break
+        frame = frame.f_back
+    return frames
+
+
+def _await_chain(coro) -> List:
+    """Frames of a suspended coroutine and everything it awaits, outermost first"""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+
+class RequestProfiler:
+    """Samples the stacks that belong to the current asyncio task"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.loop_thread = threading.get_ident()
+        self.samples: Counter = Counter()
+        self._workers: set = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self.started = 0.0
+        self.duration = 0.0
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def track_thread(self, func: Callable[[], T]) -> Callable[[], T]:
+        """Wrap work handed to a worker thread so that thread is sampled while it runs it"""
+        def tracked():
+            ident = threading.get_ident()
+            self._workers.add(ident)
+            try:
+                return func()
+            finally:
+                self._workers.discard(ident)
+        return tracked
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception:  # a racing frame must not kill the sampler
+                logger.debug("Profiler sample failed", exc_info=True)
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        workers = [frames[ident] for ident in list(self._workers) if ident in frames]
+        if workers:
+            for frame in workers:
+                stack = list(reversed(_walk(frame)))
+                while stack and stack[0].f_code.co_filename.endswith(_POOL_FRAMES):
+                    stack.pop(0)
+                self.samples[("[worker]",) + tuple(_frame_label(f) for f in stack)] += 1
+            return
+
+        coro = self.task.get_coro()
+        if asyncio.current_task(self.loop) is self.task and self.loop_thread in frames:
+            # Running: the loop thread's stack from the task's outermost coroutine down
+            stack = reversed(_walk(frames[self.loop_thread], stop=getattr(coro, "cr_frame", None)))
+            self.samples[tuple(_frame_label(f) for f in stack)] += 1
+        else:
+            # Suspended (Task.get_stack() only returns the outermost frame of a suspended coroutine)
+            stack = _await_chain(coro)
+            if stack:
+                self.samples[tuple(_frame_label(f) for f in stack) + ("[waiting]",)] += 1
+
+    def report(self, title: str, top: int = 30) -> str:
+        total = sum(self.samples.values())
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.samples.items():
+            if stack:
+                own[stack[-1]] += count
+            for label in set(stack):
+                inclusive[label] += count
+
+        def table(counts: Counter) -> List[str]:
+            return [f"{count * 100 / total:6.1f}%  {count:6d}  {label}" for label, count in counts.most_common(top)]
+
+        lines = [
+            title,
+            f"duration {self.duration * 1000:.1f} ms, {total} samples every {self.interval * 1000:.1f} ms",
+            "",
+            "-- own time --",
+            *(table(own) if total else []),
+            "",
+            "-- inclusive time --",
+            *(table(inclusive) if total else []),
+            "",
+            "-- collapsed stacks --",
+            *(f"{';'.join(stack)} {count}" for stack, count in self.samples.most_common()),
+        ]
+        return "\n".join(lines) + "\n"
+
+
+_active: ContextVar[Optional[RequestProfiler]] = ContextVar("request_profiler", default=None)
+
+
+def active_profiler() -> Optional[RequestProfiler]:
+    return _active.get()
+
+
+def _profile_dir() -> str:
+    return settings.PROFILING_DIR or os.path.join(tempfile.gettempdir(), "marketsport-profiles")
+
+
+def _profile_path(profile_id: str) -> Optional[str]:
+    try:
+        profile_id = uuid.UUID(hex=profile_id).hex
+    except ValueError:
+        return None
+    return os.path.join(_profile_dir(), f"{profile_id}.txt")
+
+
+def token_matches(token: Optional[str]) -> bool:
+    if not settings.PROFILING_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.PROFILING_TOKEN.encode())
+
+
+def read_profile(profile_id: str) -> Optional[str]:
+    path = _profile_path(profile_id)
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _write_profile(profile_id: str, report: str) -> None:
+    os.makedirs(_profile_dir(), exist_ok=True)
+    with open(_profile_path(profile_id), "w", encoding="utf-8") as f:
+        f.write(report)
+
+
+class ProfilingMiddleware:
+    """Profiles requests that ask for it with a valid token (see module docstring)"""
+
+    def __init__(self, app, paths: Sequence[str]):
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        token = dict(scope["headers"]).get(TOKEN_HEADER.encode())
+        if not token_matches(token.decode("latin-1") if token else None):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (ID_HEADER.encode(), profile_id.encode())]}
+            await send(message)
+
+        profiler = RequestProfiler(settings.PROFILING_INTERVAL)
+        context_token = _active.set(profiler)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            _active.reset(context_token)
+            title = f"{scope['method']} {scope['path']}  profile {profile_id}"
+            try:
+                # Imported here: concurrency -> profiling is the module-level direction
+                from app.core.concurrency import run_blocking
+                await run_blocking(_write_profile, profile_id, profiler.report(title))
+                logger.info("Profiled %s %s: %s", scope["method"], scope["path"], profile_id)
+            except OSError:
+                logger.exception("Could not store profile %s", profile_id)
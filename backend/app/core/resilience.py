@@ -0,0 +1,240 @@
+"""
+Resilience layer for upstream HTTP calls
+
+Wraps the shared pooled clients (app.core.http) with:
+- retries with full-jitter exponential backoff for idempotent requests
+- an optional hedged second request once the first is slower than the recent p95
+- a circuit breaker per upstream that fails fast while the upstream is down
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.http import UpstreamClients, upstreams
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class UpstreamUnavailable(Exception):
+    """Raised without calling the upstream while its circuit breaker is open"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"Upstream {upstream} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker
+
+    closed -> open after `failure_threshold` failures in a row; open -> half_open
+    after `reset_timeout`; half_open lets one probe through and closes on
+    success or re-opens on failure.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_inflight = False
+        self.transitions: Dict[str, int] = {}
+
+    def _transition(self, state: str) -> None:
+        key = f"{self.state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        logger.warning("Circuit breaker %s: %s", self.name, key)
+        self.state = state
+
+    def allow(self) -> bool:
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probe_inflight:
+                return False
+            self._probe_inflight = True
+        return True
+
+    def release_probe(self) -> None:
+        """Forget an in-flight half-open probe that ended without a result (e.g. cancelled)"""
+        self._probe_inflight = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probe_inflight = False
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_inflight = False
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+
+class LatencyTracker:
+    """Recent successful request latencies for hedge delay estimation"""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < 20:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _UpstreamState:
+    def __init__(self, name: str):
+        self.breaker = CircuitBreaker(name, settings.UPSTREAM_BREAKER_FAILURES, settings.UPSTREAM_BREAKER_RESET)
+        self.latency = LatencyTracker()
+        self.counters: Dict[str, int] = {
+            "requests": 0, "failures": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "short_circuited": 0,
+        }
+
+
+class ResilientUpstreams:
+    """request() with retries, hedging and circuit breaking on top of UpstreamClients"""
+
+    def __init__(self, clients: UpstreamClients):
+        self.clients = clients
+        self._states: Dict[str, _UpstreamState] = {}
+
+    def _state(self, upstream: str) -> _UpstreamState:
+        state = self._states.get(upstream)
+        if state is None:
+            state = self._states[upstream] = _UpstreamState(upstream)
+        return state
+
+    async def request(
+        self,
+        upstream: str,
+        method: str,
+        url: str,
+        *,
+        retry: Optional[bool] = None,
+        hedge: bool = False,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Send a request to `upstream` and return the response (any status)
+
+        retry defaults to True for idempotent methods; hedge only applies to them.
+        Raises UpstreamUnavailable while the breaker is open, httpx errors otherwise.
+        """
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        retry = idempotent if retry is None else retry
+        hedge = hedge and idempotent and settings.UPSTREAM_HEDGE_ENABLED
+        attempts = 1 + (settings.UPSTREAM_RETRY_ATTEMPTS if retry else 0)
+        state = self._state(upstream)
+
+        for attempt in range(attempts):
+            if not state.breaker.allow():
+                state.counters["short_circuited"] += 1
+                raise UpstreamUnavailable(upstream, state.breaker.retry_after())
+            if attempt:
+                state.counters["retries"] += 1
+            state.counters["requests"] += 1
+            try:
+                if hedge:
+                    response = await self._send_hedged(state, upstream, method, url, kwargs)
+                else:
+                    response = await self._send(state, upstream, method, url, kwargs)
+            except httpx.TransportError:
+                state.counters["failures"] += 1
+                state.breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+            except BaseException:
+                state.breaker.release_probe()
+                raise
+            else:
+                if response.status_code < 500:
+                    state.breaker.record_success()
+                else:
+                    state.counters["failures"] += 1
+                    state.breaker.record_failure()
+                if response.status_code not in RETRY_STATUSES or attempt + 1 >= attempts:
+                    return response
+            await asyncio.sleep(self._backoff(attempt))
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform(0, min(cap, base * 2^attempt))
+        return random.uniform(0, min(settings.UPSTREAM_RETRY_BACKOFF_MAX, settings.UPSTREAM_RETRY_BACKOFF * 2 ** attempt))
+
+    async def _send(self, state: _UpstreamState, upstream: str, method: str, url: str, kwargs: Dict[str, Any]) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.clients.get(upstream).request(method, url, **kwargs)
+        if response.status_code < 500:
+            state.latency.add(time.perf_counter() - started)
+        return response
+
+    async def _send_hedged(self, state: _UpstreamState, upstream: str, method: str, url: str, kwargs: Dict[str, Any]) -> httpx.Response:
+        p95 = state.latency.percentile(0.95)
+        if p95 is None:
+            return await self._send(state, upstream, method, url, kwargs)
+
+        primary = asyncio.ensure_future(self._send(state, upstream, method, url, kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=max(p95, settings.UPSTREAM_HEDGE_MIN_DELAY))
+        if done:
+            return primary.result()
+
+        state.counters["hedges"] += 1
+        hedged = asyncio.ensure_future(self._send(state, upstream, method, url, kwargs))
+        pending = {primary, hedged}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedged:
+                            state.counters["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "state": state.breaker.state,
+                "consecutive_failures": state.breaker.failures,
+                "transitions": dict(state.breaker.transitions),
+                "p95_latency": state.latency.percentile(0.95),
+                **state.counters,
+            }
+            for name, state in self._states.items()
+        }
+
+
+resilient = ResilientUpstreams(upstreams)
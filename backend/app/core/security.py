@@ -1,3 +1,6 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -16,10 +19,64 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
+class _VerifiedTokenCache:
+    """
+    Bounded LRU of token -> decoded payload; entries are dropped at the token's exp
+
+    verify_token runs in threadpool dependencies too, so access is locked.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            payload, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._entries.pop(token, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return payload
+
+    def set(self, token: str, payload: dict) -> None:
+        exp = payload.get("exp")
+        with self._lock:
+            self._entries[token] = (payload, float(exp) if isinstance(exp, (int, float)) else None)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = _VerifiedTokenCache(settings.JWT_CACHE_SIZE)
+
 def verify_token(token: str):
+    if settings.JWT_CACHE_ENABLED:
+        payload = token_cache.get(token)
+        if payload is not None:
+            return dict(payload)
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        return payload
     except JWTError:
         return None
+    if settings.JWT_CACHE_ENABLED:
+        # Only successfully verified tokens are cached; a hit skips signature and claim checks
+        token_cache.set(token, dict(payload))
+    return payload
 
@@ -0,0 +1,137 @@
+"""
+Signature recovery (SIWE personal_sign, EIP-712 ClobAuth) off the event loop
+
+secp256k1 public key recovery is CPU-bound, so it runs in a bounded worker
+pool (processes by default, so several logins can recover in parallel
+regardless of the GIL). The recovery functions themselves are plain
+module-level functions, picklable for the process pool.
+
+Worker processes come from a forkserver (spawn where it is unavailable)
+rather than fork: forking the running server would copy its event loop,
+pooled sockets and threads into every worker. The pool is started and
+warmed in the app lifespan so the first logins do not pay for it.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from eth_keys import keys
+from eth_utils import keccak
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def recover_personal_sign(message: str, signature: str) -> str:
+    """Lowercase address that signed `message` with personal_sign (EIP-191)"""
+    return Account.recover_message(encode_defunct(text=message), signature=signature).lower()
+
+
+@functools.lru_cache(maxsize=1)
+def _clob_auth_struct():
+    from eip712_structs import EIP712Struct, String, Address, Uint
+
+    class ClobAuth(EIP712Struct):
+        address = Address()
+        timestamp = String()
+        nonce = Uint(256)
+        message = String()
+
+    return ClobAuth
+
+
+def clob_auth_hash(domain: Dict[str, Any], message: Dict[str, Any]) -> bytes:
+    """EIP-712 hash of a ClobAuth message (same encoding as py_clob_client)"""
+    from eip712_structs import make_domain
+
+    clob_auth = _clob_auth_struct()(
+        address=message["address"],
+        timestamp=message["timestamp"],
+        nonce=message["nonce"],
+        message=message["message"],
+    )
+    eip712_domain = make_domain(name=domain["name"], version=domain["version"], chainId=domain["chainId"])
+    return keccak(clob_auth.signable_bytes(eip712_domain))
+
+
+def recover_hash_signer(message_hash: bytes, signature: str) -> str:
+    """Lowercase address from a 65-byte r||s||v signature over message_hash (v may be 0/1 or 27/28)"""
+    signature_bytes = bytes.fromhex(signature[2:] if signature.startswith("0x") else signature)
+    if len(signature_bytes) != 65:
+        raise ValueError(f"Invalid signature length: {len(signature_bytes)}, expected 65")
+
+    # EIP-712 wallets use v = 27 or 28, eth_keys expects v = 0 or 1
+    v = signature_bytes[64]
+    if v >= 27:
+        v -= 27
+    elif v > 1:
+        raise ValueError(f"Invalid v value: {v}. Expected 0, 1, 27, or 28.")
+
+    signature_obj = keys.Signature(signature_bytes=signature_bytes[:64] + bytes([v]))
+    return signature_obj.recover_public_key_from_msg_hash(message_hash).to_checksum_address().lower()
+
+
+def recover_clob_auth(domain: Dict[str, Any], message: Dict[str, Any], signature: str) -> str:
+    """Lowercase address that signed the EIP-712 ClobAuth typed data"""
+    return recover_hash_signer(clob_auth_hash(domain, message), signature)
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+def _mp_context():
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    context = multiprocessing.get_context(method)
+    if method == "forkserver":
+        # Workers fork from a server that already imported the recovery code
+        context.set_forkserver_preload([__name__])
+    return context
+
+
+class SignatureWorkers:
+    """Lazily created, bounded executor for signature recovery"""
+
+    def __init__(self):
+        self._executor: Optional[Executor] = None
+        self._workers = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            workers = self._workers = settings.SIGNATURE_POOL_WORKERS or os.cpu_count() or 1
+            if settings.SIGNATURE_POOL == "process":
+                self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="signature")
+            logger.info("Signature %s pool started with %d workers", settings.SIGNATURE_POOL, workers)
+        return self._executor
+
+    async def start(self) -> None:
+        """Create the pool and start its workers (no-op for the inline pool)"""
+        if settings.SIGNATURE_POOL == "inline":
+            return
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        # Submitted together, so each one needs another worker
+        await asyncio.gather(*(loop.run_in_executor(executor, _warm_up) for _ in range(self._workers)))
+
+    async def run(self, func, *args):
+        if settings.SIGNATURE_POOL == "inline":
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+signature_workers = SignatureWorkers()
@@ -0,0 +1,164 @@
+"""
+Per-request timing breakdown, returned as a Server-Timing header
+
+RequestTimingMiddleware puts a RequestTimings in a context variable; the DB
+and upstream instrumentation (app.core.metrics) add to it, get_current_user
+times itself with `measure("auth")` and TimedRoute marks when the endpoint
+returns. Entries:
+
+- auth: get_current_user, minus the DB/pool/upstream time spent inside it
+- db, upstream: summed over statements / calls (concurrent upstream calls
+  can add up to more than the wall time)
+- pool: waiting for a pooled DB connection (only when there was a wait)
+- app: rest of the time until the endpoint returned
+- serialize: endpoint return -> response start (validation, JSON encoding)
+- total: until the response start
+"""
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional
+
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+
+
+class RequestTimings:
+    __slots__ = (
+        "started", "phases", "db", "db_queries", "pool_wait", "upstream", "upstream_calls",
+        "handler_done", "io_at_handler_done",
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.db = 0.0
+        self.db_queries = 0
+        self.pool_wait = 0.0
+        self.upstream = 0.0
+        self.upstream_calls = 0
+        self.handler_done: Optional[float] = None
+        self.io_at_handler_done = 0.0
+
+    def add_db(self, seconds: float) -> None:
+        self.db += seconds
+        self.db_queries += 1
+
+    def add_pool_wait(self, seconds: float) -> None:
+        self.pool_wait += seconds
+
+    def add_upstream(self, seconds: float) -> None:
+        self.upstream += seconds
+        self.upstream_calls += 1
+
+    @property
+    def io(self) -> float:
+        """Time attributed to db / pool / upstream so far"""
+        return self.db + self.pool_wait + self.upstream
+
+    def mark_handler_done(self) -> None:
+        self.handler_done = time.perf_counter()
+        self.io_at_handler_done = self.io
+
+    def header(self, now: Optional[float] = None) -> str:
+        """Server-Timing value (durations in ms)"""
+        now = time.perf_counter() if now is None else now
+        total = now - self.started
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        entries.append(f'db;dur={self.db * 1000:.1f};desc="{self.db_queries} queries"')
+        if self.pool_wait >= 0.0001:
+            entries.append(f"pool;dur={self.pool_wait * 1000:.1f}")
+        entries.append(f'upstream;dur={self.upstream * 1000:.1f};desc="{self.upstream_calls} calls"')
+        if self.handler_done is not None:
+            handler = self.handler_done - self.started
+            app = handler - sum(self.phases.values()) - self.io_at_handler_done
+            serialize = now - self.handler_done - (self.io - self.io_at_handler_done)
+            entries.append(f"app;dur={max(app, 0.0) * 1000:.1f}")
+            entries.append(f"serialize;dur={max(serialize, 0.0) * 1000:.1f}")
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Timings of the request being served (also in worker threads), or None"""
+    return _current.get()
+
+
+@contextmanager
+def measure(phase: str) -> Iterator[None]:
+    """Add the wall time of the block to `phase`, excluding DB/pool/upstream time spent in it"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    io_before = timings.io
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started - (timings.io - io_before)
+        timings.phases[phase] = timings.phases.get(phase, 0.0) + max(elapsed, 0.0)
+
+
+def _mark_handler_done(endpoint: Callable) -> Callable:
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                timings = _current.get()
+                if timings is not None:
+                    timings.mark_handler_done()
+    else:
+        @functools.wraps(endpoint)
+        def timed_endpoint(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                timings = _current.get()
+                if timings is not None:
+                    timings.mark_handler_done()
+    return timed_endpoint
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records when the endpoint returns (before response serialization)"""
+
+    def get_route_handler(self):
+        # FastAPI calls dependant.call with the resolved parameters; wrapping it keeps them as they are
+        self.dependant.call = _mark_handler_done(self.endpoint)
+        return super().get_route_handler()
+
+
+class RequestTimingMiddleware:
+    """Sets up RequestTimings per HTTP request and adds the Server-Timing header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.SERVER_TIMING_ENABLED:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current.set(timings)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
@@ -1,16 +1,54 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import auth, matches, polymarket
+from fastapi.responses import PlainTextResponse
+from app.core.logging_config import configure_logging
+
+# Before the app modules are imported, so import-time log records are handled too
+configure_logging()
+
+from app.api import auth, matches, polymarket, stream
 from app.core.config import settings
 from app.core.database import engine, Base
+from app.core.http import upstreams
+from app.core.concurrency import configure_threadpool, run_blocking
+from app.core.logging_config import logging_stats
+from app.core.metrics import MetricsMiddleware, register_cache_stats, registry
+from app.core.profiling import ProfilingMiddleware, read_profile, token_matches
+from app.core.resilience import CLOSED, HALF_OPEN, OPEN, resilient
+from app.core.security import token_cache
+from app.core.signatures import signature_workers
+from app.core.timing import RequestTimingMiddleware
+from app.polymarket.market_snapshots import snapshot_refresher
+from app.polymarket.orderbook_feed import orderbook_feed
+from app.polymarket.stream_hub import stream_hub
 
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_threadpool()
+    # Pooled upstream HTTP clients live for the whole application
+    await upstreams.startup()
+    await signature_workers.start()
+    if settings.MARKET_SNAPSHOT_ENABLED:
+        snapshot_refresher.start()
+    if settings.ORDERBOOK_WS_ENABLED:
+        orderbook_feed.start()
+    try:
+        yield
+    finally:
+        await orderbook_feed.stop()
+        await snapshot_refresher.stop()
+        await upstreams.shutdown()
+        signature_workers.shutdown()
+
 app = FastAPI(
     title="Marketsport API",
     description="Trading platform for Polymarket CLOB",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -28,12 +66,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+if settings.PROFILING_TOKEN:
+    app.add_middleware(ProfilingMiddleware, paths=[p.strip() for p in settings.PROFILING_PATHS.split(",") if p.strip()])
+
+# Outside CORS, so the timings include it; RequestTimingMiddleware must wrap MetricsMiddleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestTimingMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(matches.router, prefix="/api/matches", tags=["matches"])
 app.include_router(polymarket.router, prefix="/api/polymarket", tags=["polymarket"])
+app.include_router(stream.router, prefix="/api/stream", tags=["stream"])
 
 @app.get("/")
 async def root():
@@ -43,3 +91,45 @@ async def root():
 async def health():
     return {"status": "ok"}
 
+@app.get("/health/upstreams")
+async def health_upstreams():
+    """Circuit breaker state, retry/hedge counters and p95 latency per upstream"""
+    return resilient.stats()
+
+
+# Scrape-time metrics read from the components' own counters
+_BREAKER_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+register_cache_stats(lambda: [
+    ("market", polymarket.market_cache.stats()),
+    ("balance", polymarket.balance_cache.stats()),
+    ("user", auth.user_cache.stats()),
+    ("jwt", {"hits": token_cache.hits, "misses": token_cache.misses, "size": len(token_cache)}),
+])
+registry.gauge(
+    "upstream_breaker_state", "Circuit breaker state (0 closed, 1 half open, 2 open)", ("upstream",),
+    lambda: {(name,): _BREAKER_STATES[stats["state"]] for name, stats in resilient.stats().items()},
+)
+registry.gauge("orderbook_ws_connected", "CLOB market websocket connected", (),
+               lambda: {(): int(orderbook_feed.connected)})
+registry.gauge("orderbook_books", "Order books held in memory", (), lambda: {(): len(orderbook_feed.books)})
+registry.gauge("stream_connections", "Open SSE / WebSocket price streams", (), lambda: {(): stream_hub.connections})
+registry.counter("log_records_dropped_total", "Log records dropped because the queue was full", (),
+                 lambda: {(): logging_stats()["dropped"]})
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+async def get_profile(profile_id: str, x_profile_token: str = Header(None)):
+    """Report of a profiled request (id from its X-Profile-Id response header)"""
+    if not token_matches(x_profile_token):
+        raise HTTPException(status_code=404, detail="Not found")
+    report = await run_blocking(read_profile, profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(report)
@@ -1,6 +1,7 @@
 from app.models.user import User
 from app.models.match import Match
 from app.models.polymarket_market import PolymarketMarket
+from app.models.auth_nonce import AuthNonce
 
-__all__ = ["User", "Match", "PolymarketMarket"]
+__all__ = ["User", "Match", "PolymarketMarket", "AuthNonce"]
 
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime
+from app.core.database import Base
+
+class AuthNonce(Base):
+    __tablename__ = "auth_nonces"
+    
+    # One pending SIWE nonce per EOA address (issuing a new one replaces it)
+    address = Column(String, primary_key=True)
+    nonce = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -1,9 +1,18 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 class Match(Base):
     __tablename__ = "matches"
+    # GET /api/matches pages by (start_time, id); each filter has an index that
+    # serves the filter and the ordering in one range scan
+    __table_args__ = (
+        Index("ix_matches_start_time_id", "start_time", "id"),
+        Index("ix_matches_league_start_time_id", "league", "start_time", "id"),
+        Index("ix_matches_sport_start_time_id", "sport", "start_time", "id"),
+        Index("ix_matches_home_team_start_time_id", "home_team", "start_time", "id"),
+        Index("ix_matches_away_team_start_time_id", "away_team", "start_time", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     external_id = Column(String, unique=True, index=True, nullable=False)
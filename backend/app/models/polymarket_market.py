@@ -7,7 +7,7 @@ class PolymarketMarket(Base):
     __tablename__ = "polymarket_markets"
     
     id = Column(Integer, primary_key=True, index=True)
-    match_id = Column(Integer, ForeignKey("matches.id"), nullable=False)
+    match_id = Column(Integer, ForeignKey("matches.id"), nullable=False, index=True)
     token_id = Column(String, unique=True, index=True, nullable=False)
     market_name = Column(String, nullable=False)
     status = Column(String, default="active")
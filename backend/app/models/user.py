@@ -7,7 +7,7 @@ class User(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     did = Column(String, unique=True, index=True, nullable=False)
-    wallet_address = Column(String, nullable=False)  # EOA signing address (for EIP-712 signatures)
+    wallet_address = Column(String, nullable=False, index=True)  # EOA signing address (for EIP-712 signatures)
     polymarket_wallet_address = Column(String, nullable=True)  # Polymarket internal wallet (funder) for balance/positions
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
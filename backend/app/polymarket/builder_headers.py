@@ -7,6 +7,9 @@ from datetime import datetime
 import hmac
 import hashlib
 import base64
+import logging
+
+logger = logging.getLogger(__name__)
 
 def generate_builder_headers(method: str, path: str, body: str = "") -> dict:
     """
@@ -23,11 +26,11 @@ def generate_builder_headers(method: str, path: str, body: str = "") -> dict:
     """
     # Check if builder credentials are configured
     if not hasattr(settings, 'POLY_BUILDER_KEY') or not settings.POLY_BUILDER_KEY:
-        print("[Builder Headers] ⚠️ POLY_BUILDER_KEY not configured, skipping builder headers")
+        logger.warning("[Builder Headers] POLY_BUILDER_KEY not configured, skipping builder headers")
         return {}
     
     if not hasattr(settings, 'POLY_BUILDER_SECRET') or not settings.POLY_BUILDER_SECRET:
-        print("[Builder Headers] ⚠️ POLY_BUILDER_SECRET not configured, skipping builder headers")
+        logger.warning("[Builder Headers] POLY_BUILDER_SECRET not configured, skipping builder headers")
         return {}
     
     try:
@@ -49,13 +52,11 @@ def generate_builder_headers(method: str, path: str, body: str = "") -> dict:
             "X-Builder-Timestamp": timestamp,
         }
         
-        print(f"[Builder Headers] ✅ Generated builder headers for {method} {path}")
+        logger.debug("[Builder Headers] Generated builder headers for %s %s", method, path)
         return headers
         
     except Exception as e:
-        print(f"[Builder Headers] ❌ Error generating builder headers: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[Builder Headers] Error generating builder headers: %s", e)
         # Return empty dict on error - builder headers are optional
         return {}
 
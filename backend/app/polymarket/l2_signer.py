@@ -0,0 +1,125 @@
+"""
+L2 (API key) authentication headers for CLOB requests
+
+The per-user secret is base64-decoded once and kept as a keyed HMAC-SHA256
+object; each request only copies it and feeds the message
+(timestamp + METHOD + path + body, same as py_clob_client). Entries are keyed
+by signing address and re-derived when the stored creds change.
+"""
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+from app.models.user import User
+
+
+class L2CredentialsMissing(Exception):
+    """User has no (complete) L2 API creds or no signing address"""
+
+
+class L2Signer:
+    """Signs L2 requests for one set of API creds"""
+
+    __slots__ = ("api_key", "secret", "passphrase", "_hmac", "_base_headers")
+
+    def __init__(self, address: str, api_key: str, secret: str, passphrase: str):
+        self.api_key = api_key
+        self.secret = secret
+        self.passphrase = passphrase
+        self._hmac = hmac.new(decode_secret(secret), digestmod=hashlib.sha256)
+        # POLY_ADDRESS is the signing address (EOA) the keys were created for
+        self._base_headers = {
+            "POLY_ADDRESS": address,
+            "POLY_API_KEY": api_key,
+            "POLY_PASSPHRASE": passphrase,
+        }
+
+    def matches(self, user: User) -> bool:
+        return (
+            self.api_key == user.clob_api_key
+            and self.secret == user.clob_api_secret
+            and self.passphrase == user.clob_api_passphrase
+        )
+
+    def sign(self, timestamp: str, method: str, path: str, body: Union[str, bytes] = "") -> str:
+        """urlsafe base64 HMAC over timestamp + METHOD + path (no query string) + body"""
+        mac = self._hmac.copy()
+        mac.update(f"{timestamp}{method.upper()}{path}".encode())
+        if body:
+            mac.update(body if isinstance(body, bytes) else body.encode())
+        return base64.urlsafe_b64encode(mac.digest()).decode()
+
+    def headers(
+        self,
+        method: str,
+        path: str,
+        body: Union[str, bytes] = "",
+        timestamp: Optional[int] = None,
+    ) -> Dict[str, str]:
+        """POLY_* headers for one request; the caller may add its own to the returned dict"""
+        timestamp_str = str(int(time.time()) if timestamp is None else timestamp)
+        headers = self._base_headers.copy()
+        headers["POLY_SIGNATURE"] = self.sign(timestamp_str, method, path, body)
+        headers["POLY_TIMESTAMP"] = timestamp_str
+        return headers
+
+
+def decode_secret(secret: str) -> bytes:
+    """
+    Decode a CLOB API secret
+
+    urlsafe_b64decode accepts both the urlsafe and the standard alphabet;
+    missing padding is restored first.
+    """
+    secret = secret.strip()
+    return base64.urlsafe_b64decode(secret + "=" * (-len(secret) % 4))
+
+
+class L2SignerCache:
+    """Bounded LRU of L2Signer per signing address"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._signers: "OrderedDict[str, L2Signer]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def for_user(self, user: User) -> L2Signer:
+        if not user.clob_api_key or not user.clob_api_secret or not user.clob_api_passphrase:
+            raise L2CredentialsMissing("L2 credentials missing. Please complete enable-trading first.")
+        if not user.wallet_address:
+            raise L2CredentialsMissing("Wallet address (signing address/EOA) not set. Please complete enable-trading first.")
+
+        address = user.wallet_address.lower()
+        with self._lock:
+            signer = self._signers.get(address)
+            if signer is not None and signer.matches(user):
+                self._signers.move_to_end(address)
+                return signer
+
+        signer = L2Signer(address, user.clob_api_key, user.clob_api_secret, user.clob_api_passphrase)
+        with self._lock:
+            self._signers[address] = signer
+            self._signers.move_to_end(address)
+            while len(self._signers) > self.max_size:
+                self._signers.popitem(last=False)
+        return signer
+
+    def invalidate(self, *addresses: Optional[str]) -> None:
+        with self._lock:
+            for address in addresses:
+                if address:
+                    self._signers.pop(address.lower(), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._signers.clear()
+
+    def __len__(self) -> int:
+        return len(self._signers)
+
+
+l2_signers = L2SignerCache()
@@ -2,10 +2,16 @@
 Polymarket Market Client for searching markets by event slug
 Uses Gamma Events API to query Polymarket markets
 """
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Awaitable, Tuple
+import asyncio
+import logging
 import httpx
 import json
 from app.core.config import settings
+from app.core.http import GAMMA
+from app.core.resilience import resilient
+
+logger = logging.getLogger(__name__)
 
 
 class PolymarketMarketClient:
@@ -13,9 +19,9 @@ class PolymarketMarketClient:
     
     def __init__(self):
         # Gamma Events API endpoint
-        self.gamma_api_url = "https://gamma-api.polymarket.com"
+        self.gamma_api_url = settings.POLY_GAMMA_API_URL
     
-    def search_market_by_slug(self, event_slug: str) -> Optional[Dict[str, Any]]:
+    async def search_market_by_slug(self, event_slug: str) -> Optional[Dict[str, Any]]:
         """
         Search for a market by event slug (e.g., 'nhl-cbj-car-2025-12-10')
         Uses Gamma Events API: GET /events/slug/{slug}
@@ -30,60 +36,119 @@ class PolymarketMarketClient:
             return None
         
         try:
-            return self._search_via_gamma_api(event_slug)
+            return await self._search_via_gamma_api(event_slug)
         except Exception as e:
-            print(f"[PolymarketMarketClient] Error searching market: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[PolymarketMarketClient] Error searching market: %s", e)
             return None
     
-    def _search_via_gamma_api(self, event_slug: str) -> Optional[Dict[str, Any]]:
+    async def search_markets_by_slugs(
+        self,
+        event_slugs: List[str],
+        max_concurrency: int = 8,
+        loader: Optional[Callable[[str], Awaitable[Optional[Dict[str, Any]]]]] = None,
+    ) -> Tuple[Dict[str, Optional[Dict[str, Any]]], Dict[str, str]]:
+        """
+        Resolve several event slugs concurrently
+        
+        Slugs are deduplicated and at most `max_concurrency` lookups run at once.
+        `loader` defaults to fetch_event_market; callers can pass a cached loader.
+        
+        Returns:
+            (market data by slug (None if not found), error message by slug)
+        """
+        loader = loader or self.fetch_event_market
+        unique_slugs = list(dict.fromkeys(slug for slug in event_slugs if slug))
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def resolve(slug: str):
+            async with semaphore:
+                return await loader(slug)
+        
+        results = await asyncio.gather(*(resolve(slug) for slug in unique_slugs), return_exceptions=True)
+        
+        markets: Dict[str, Optional[Dict[str, Any]]] = {}
+        errors: Dict[str, str] = {}
+        for slug, result in zip(unique_slugs, results):
+            if isinstance(result, Exception):
+                logger.debug("[PolymarketMarketClient] Batch lookup failed for %s: %s", slug, result)
+                errors[slug] = str(result) or type(result).__name__
+            else:
+                markets[slug] = result
+        return markets, errors
+    
+    async def _search_via_gamma_api(self, event_slug: str) -> Optional[Dict[str, Any]]:
         """Search market using Gamma Events API"""
         try:
-            url = f"{self.gamma_api_url}/events/slug/{event_slug}"
-            
-            response = httpx.get(
-                url,
-                headers={"Accept": "application/json"},
-                timeout=10.0,
-                follow_redirects=True
-            )
-            
-            if response.status_code != 200:
-                print(f"[PolymarketMarketClient] Gamma API request failed: {response.status_code}")
-                return None
-            
-            event = response.json()
-            
-            if not event or not isinstance(event, dict):
-                print(f"[PolymarketMarketClient] Invalid response format from Gamma API")
-                return None
-            
-            # Извлекаем markets из события
-            markets = event.get("markets", [])
-            if not markets:
-                print(f"[PolymarketMarketClient] No markets found in event: {event_slug}")
-                return None
-            
-            # Берем первый маркет (обычно это moneyline)
-            # Можно фильтровать по sportsMarketType если нужно
-            market = markets[0]
-            
-            # Ищем moneyline маркет, если есть несколько
-            for m in markets:
-                if m.get("sportsMarketType") == "moneyline":
-                    market = m
-                    break
-            
-            print(f"[PolymarketMarketClient] Found market via Gamma API: {market.get('slug', event_slug)}")
-            return self._format_market_data_from_gamma(event, market)
-            
+            return await self.fetch_event_market(event_slug)
         except Exception as e:
-            print(f"[PolymarketMarketClient] Gamma API search error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[PolymarketMarketClient] Gamma API search error: %s", e)
             return None
     
+    async def fetch_event_market(self, event_slug: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch event from Gamma Events API and format its moneyline market
+        
+        Returns None if the event or its markets are not found; network errors and 5xx are raised
+        """
+        url = f"{self.gamma_api_url}/events/slug/{event_slug}"
+        
+        response = await resilient.request(
+            GAMMA, "GET", url,
+            hedge=True,
+            headers={"Accept": "application/json"}
+        )
+        
+        if response.status_code >= 500:
+            # Upstream failure (after retries) is an error, not a missing event
+            response.raise_for_status()
+        if response.status_code != 200:
+            logger.warning("[PolymarketMarketClient] Gamma API request failed: %s", response.status_code)
+            return None
+        
+        event = response.json()
+        
+        if not event or not isinstance(event, dict):
+            logger.debug("[PolymarketMarketClient] Invalid response format from Gamma API")
+            return None
+        
+        # Извлекаем markets из события
+        markets = event.get("markets", [])
+        if not markets:
+            logger.debug("[PolymarketMarketClient] No markets found in event: %s", event_slug)
+            return None
+        
+        # Берем первый маркет (обычно это moneyline)
+        # Можно фильтровать по sportsMarketType если нужно
+        market = markets[0]
+        
+        # Ищем moneyline маркет, если есть несколько
+        for m in markets:
+            if m.get("sportsMarketType") == "moneyline":
+                market = m
+                break
+        
+        logger.debug("[PolymarketMarketClient] Found market via Gamma API: %s", market.get('slug', event_slug))
+        return self._format_market_data_from_gamma(event, market)
+    
+    async def fetch_markets_by_token_ids(self, token_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Fetch raw Gamma markets that contain any of the given CLOB token IDs
+        Uses Gamma Markets API: GET /markets?clob_token_ids=...
+        """
+        if not token_ids:
+            return []
+        
+        response = await resilient.request(
+            GAMMA, "GET", f"{self.gamma_api_url}/markets",
+            hedge=True,
+            params=[("clob_token_ids", token_id) for token_id in token_ids],
+            headers={"Accept": "application/json"}
+        )
+        response.raise_for_status()
+        
+        data = response.json()
+        return data if isinstance(data, list) else []
+    
     def _format_market_data_from_gamma(self, event: Dict[str, Any], market: Dict[str, Any]) -> Dict[str, Any]:
         """Format market data from Gamma Events API response"""
         try:
@@ -156,14 +221,13 @@ class PolymarketMarketClient:
                 "bestBid": float(market.get("bestBid", 0)) if market.get("bestBid") else None,
                 "bestAsk": float(market.get("bestAsk", 0)) if market.get("bestAsk") else None,
                 "lastTradePrice": float(market.get("lastTradePrice", 0)) if market.get("lastTradePrice") else None,
+                "startTime": market.get("gameStartTime") or event.get("startTime"),
             }
             
-            print(f"[PolymarketMarketClient] Formatted market data: eventSlug={result['eventSlug']}, tokenId={result['tokenId']}")
+            logger.debug("[PolymarketMarketClient] Formatted market data: eventSlug=%s, tokenId=%s", result['eventSlug'], result['tokenId'])
             return result
         except Exception as e:
-            print(f"[PolymarketMarketClient] Error formatting market data from Gamma API: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[PolymarketMarketClient] Error formatting market data from Gamma API: %s", e)
             return None
     
     def _search_via_clob(self, event_slug: str) -> Optional[Dict[str, Any]]:
@@ -180,7 +244,7 @@ class PolymarketMarketClient:
             )
             
             if response.status_code != 200:
-                print(f"[PolymarketMarketClient] CLOB API request failed: {response.status_code}")
+                logger.warning("[PolymarketMarketClient] CLOB API request failed: %s", response.status_code)
                 return None
             
             data = response.json()
@@ -191,15 +255,15 @@ class PolymarketMarketClient:
             elif isinstance(data, list):
                 markets = data
             else:
-                print(f"[PolymarketMarketClient] Invalid response format: {type(data)}")
+                logger.debug("[PolymarketMarketClient] Invalid response format: %s", type(data))
                 return None
             
             if not markets or not isinstance(markets, list):
-                print(f"[PolymarketMarketClient] No markets in response")
+                logger.debug("[PolymarketMarketClient] No markets in response")
                 return None
             
             # Ищем во всех рынках (не только активных), так как рынок может быть закрыт
-            print(f"[PolymarketMarketClient] Searching in {len(markets)} markets")
+            logger.debug("[PolymarketMarketClient] Searching in %s markets", len(markets))
             
             # Search for market matching the event slug
             # Event slug format: nhl-cbj-car-2025-12-10
@@ -225,12 +289,12 @@ class PolymarketMarketClient:
                 
                 # Прямое совпадение slug - наивысший приоритет
                 if market_slug == event_slug_lower:
-                    print(f"[PolymarketMarketClient] Found exact match: {market_slug}")
+                    logger.debug("[PolymarketMarketClient] Found exact match: %s", market_slug)
                     return self._format_market_data_from_clob(market)
                 
                 # Частичное совпадение slug
                 if event_slug_lower in market_slug or market_slug in event_slug_lower:
-                    print(f"[PolymarketMarketClient] Found partial slug match: {market_slug}")
+                    logger.debug("[PolymarketMarketClient] Found partial slug match: %s", market_slug)
                     return self._format_market_data_from_clob(market)
                 
                 # Поиск по аббревиатурам команд (с приоритетом активным рынкам)
@@ -244,14 +308,14 @@ class PolymarketMarketClient:
                             best_score = score
             
             if best_match:
-                print(f"[PolymarketMarketClient] Found match by team abbrevs: {best_match.get('market_slug')}")
+                logger.debug("[PolymarketMarketClient] Found match by team abbrevs: %s", best_match.get('market_slug'))
                 return self._format_market_data_from_clob(best_match)
             
-            print(f"[PolymarketMarketClient] No market found for eventSlug: {event_slug}")
+            logger.debug("[PolymarketMarketClient] No market found for eventSlug: %s", event_slug)
             return None
             
         except Exception as e:
-            print(f"[PolymarketMarketClient] CLOB API search error: {e}")
+            logger.warning("[PolymarketMarketClient] CLOB API search error: %s", e)
             return None
     
     def _format_market_data_from_clob(self, market: Dict[str, Any]) -> Dict[str, Any]:
@@ -261,7 +325,7 @@ class PolymarketMarketClient:
             tokens = market.get("tokens", [])
             
             if not tokens or len(tokens) < 2:
-                print(f"[PolymarketMarketClient] Warning: Market has {len(tokens)} tokens, expected at least 2")
+                logger.warning("[PolymarketMarketClient] Warning: Market has %s tokens, expected at least 2", len(tokens))
                 # Возвращаем данные даже если токенов меньше 2
                 return {
                     "eventSlug": market.get("market_slug", market.get("question", "")),
@@ -317,12 +381,10 @@ class PolymarketMarketClient:
                 "active": market.get("active", True)
             }
             
-            print(f"[PolymarketMarketClient] Formatted market data: eventSlug={result['eventSlug']}, tokenId={result['tokenId']}")
+            logger.debug("[PolymarketMarketClient] Formatted market data: eventSlug=%s, tokenId=%s", result['eventSlug'], result['tokenId'])
             return result
         except Exception as e:
-            print(f"[PolymarketMarketClient] Error formatting market data: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[PolymarketMarketClient] Error formatting market data: %s", e)
             return None
     
     def _search_via_graph(self, event_slug: str) -> Optional[Dict[str, Any]]:
@@ -370,13 +432,13 @@ class PolymarketMarketClient:
             )
             
             if response.status_code != 200:
-                print(f"[PolymarketMarketClient] GraphQL request failed: {response.status_code}")
+                logger.warning("[PolymarketMarketClient] GraphQL request failed: %s", response.status_code)
                 return None
             
             data = response.json()
             
             if "errors" in data:
-                print(f"[PolymarketMarketClient] GraphQL errors: {data['errors']}")
+                logger.warning("[PolymarketMarketClient] GraphQL errors: %s", data['errors'])
                 return None
             
             markets = data.get("data", {}).get("markets", [])
@@ -394,7 +456,7 @@ class PolymarketMarketClient:
             return self._format_market_data(markets[0])
             
         except Exception as e:
-            print(f"[PolymarketMarketClient] Graph API search error: {e}")
+            logger.warning("[PolymarketMarketClient] Graph API search error: %s", e)
             return None
     
     def _search_by_teams(self, event_slug: str) -> Optional[Dict[str, Any]]:
@@ -451,7 +513,7 @@ class PolymarketMarketClient:
             )
             
             if response.status_code != 200:
-                print(f"[PolymarketMarketClient] GraphQL request failed (alternative search): {response.status_code}")
+                logger.warning("[PolymarketMarketClient] GraphQL request failed (alternative search): %s", response.status_code)
                 return None
             
             data = response.json()
@@ -470,7 +532,7 @@ class PolymarketMarketClient:
             return self._format_market_data(markets[0])
             
         except Exception as e:
-            print(f"[PolymarketMarketClient] Error in alternative search: {e}")
+            logger.warning("[PolymarketMarketClient] Error in alternative search: %s", e)
             return None
     
     def _format_market_data(self, market: Dict[str, Any]) -> Dict[str, Any]:
@@ -0,0 +1,361 @@
+"""
+Background market snapshot refresher
+
+Keeps an in-memory table of formatted event markets (by event slug) and compact
+per-token quotes (bestBid/bestAsk/lastTradePrice/outcomePrice) that request
+handlers can read without touching Gamma. Refresh cadence adapts to how close
+each game is to puck drop.
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Container, Dict, Iterable, List, Optional, Set
+
+from app.core.concurrency import run_blocking
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.match import Match
+from app.models.polymarket_market import PolymarketMarket
+from app.polymarket.market_client import PolymarketMarketClient
+
+logger = logging.getLogger(__name__)
+
+_SLUG_DATE_RE = re.compile(r"(\d{4}-\d{2}-\d{2})$")
+
+
+class TokenQuote:
+    """Top-of-book snapshot for one outcome token"""
+    __slots__ = ("token_id", "best_bid", "best_ask", "last_trade_price", "outcome_price", "updated_at")
+
+    def __init__(self, token_id: str, best_bid: Optional[float], best_ask: Optional[float],
+                 last_trade_price: Optional[float], outcome_price: Optional[float], updated_at: float):
+        self.token_id = token_id
+        self.best_bid = best_bid
+        self.best_ask = best_ask
+        self.last_trade_price = last_trade_price
+        self.outcome_price = outcome_price
+        self.updated_at = updated_at
+
+    @property
+    def mid(self) -> Optional[float]:
+        """Bid/ask midpoint, None unless both sides are quoted"""
+        if self.best_bid is not None and self.best_ask is not None:
+            return (self.best_bid + self.best_ask) / 2
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tokenId": self.token_id,
+            "bestBid": self.best_bid,
+            "bestAsk": self.best_ask,
+            "lastTradePrice": self.last_trade_price,
+            "outcomePrice": self.outcome_price,
+            "mid": self.mid,
+            "snapshotAt": self.updated_at,
+        }
+
+
+def _complement(price: Optional[float]) -> Optional[float]:
+    return round(1.0 - price, 6) if price is not None else None
+
+
+def _event_token_ids(market: Dict[str, Any]) -> List[str]:
+    return [token_id for token_id in (market.get("tokenId"), market.get("homeTokenId")) if token_id]
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_json_list(value: Any) -> List[Any]:
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            parsed = json.loads(value)
+            return parsed if isinstance(parsed, list) else []
+        except ValueError:
+            return [item.strip() for item in value.split(",") if item.strip()]
+    return []
+
+
+def _parse_start_time(value: Any, event_slug: Optional[str] = None) -> Optional[float]:
+    """Unix timestamp from a Gamma start time string, falling back to the slug's yyyy-mm-dd suffix"""
+    if isinstance(value, str) and value:
+        text = value.strip().replace(" ", "T").replace("Z", "+00:00")
+        if text.endswith("+00"):
+            text += ":00"
+        try:
+            parsed = datetime.fromisoformat(text)
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+        except ValueError:
+            pass
+    if event_slug:
+        match = _SLUG_DATE_RE.search(event_slug)
+        if match:
+            return datetime.strptime(match.group(1), "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+    return None
+
+
+def refresh_interval(start_time: Optional[float], now: Optional[float] = None) -> float:
+    """Refresh cadence for a market whose game starts at `start_time` (unix seconds)"""
+    if start_time is None:
+        return settings.MARKET_SNAPSHOT_INTERVAL_SOON
+    now = now or time.time()
+    until_start = start_time - now
+    if until_start <= settings.MARKET_SNAPSHOT_LIVE_WINDOW:
+        # Starting soon or in progress (NHL games rarely run past ~4h)
+        if until_start > -4 * 3600:
+            return settings.MARKET_SNAPSHOT_INTERVAL_LIVE
+        return settings.MARKET_SNAPSHOT_INTERVAL_FAR
+    if until_start <= 24 * 3600:
+        return settings.MARKET_SNAPSHOT_INTERVAL_SOON
+    return settings.MARKET_SNAPSHOT_INTERVAL_FAR
+
+
+class MarketSnapshotTable:
+    """In-memory snapshot table: formatted event markets by slug and quotes by token ID"""
+
+    def __init__(self):
+        self._events: Dict[str, tuple] = {}  # slug -> (market dict, updated_at, max_age)
+        self._quotes: Dict[str, TokenQuote] = {}
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Call listener(event_slug, market) whenever an event snapshot is stored"""
+        self._listeners.append(listener)
+
+    def get_event(self, event_slug: str) -> Optional[Dict[str, Any]]:
+        """Formatted market for slug with freshness fields, or None if missing or too old"""
+        entry = self._events.get(event_slug)
+        if entry is None:
+            return None
+        market, updated_at, max_age = entry
+        age = time.time() - updated_at
+        if age > max_age:
+            return None
+        return {**market, "snapshotAt": updated_at, "snapshotAge": round(age, 3)}
+
+    def get_quote(self, token_id: str) -> Optional[TokenQuote]:
+        return self._quotes.get(token_id)
+
+    def put_event(self, event_slug: str, market: Dict[str, Any], max_age: float) -> None:
+        now = time.time()
+        self._events[event_slug] = (market, now, max_age)
+
+        away_token = market.get("tokenId")
+        home_token = market.get("homeTokenId")
+        best_bid = market.get("bestBid")
+        best_ask = market.get("bestAsk")
+        last_trade = market.get("lastTradePrice")
+        if away_token:
+            self._quotes[away_token] = TokenQuote(away_token, best_bid, best_ask, last_trade, market.get("awayPrice"), now)
+        if home_token:
+            # Binary market: the second outcome's book mirrors the first one
+            self._quotes[home_token] = TokenQuote(
+                home_token, _complement(best_ask), _complement(best_bid), _complement(last_trade),
+                market.get("homePrice"), now
+            )
+        for listener in self._listeners:
+            try:
+                listener(event_slug, market)
+            except Exception:
+                logger.exception("Market snapshot listener failed")
+
+    def put_gamma_market(self, market: Dict[str, Any]) -> None:
+        """Update token quotes from a raw Gamma market (GET /markets)"""
+        now = time.time()
+        token_ids = _parse_json_list(market.get("clobTokenIds"))
+        prices = _parse_json_list(market.get("outcomePrices"))
+        best_bid = _to_float(market.get("bestBid"))
+        best_ask = _to_float(market.get("bestAsk"))
+        last_trade = _to_float(market.get("lastTradePrice"))
+        for index, token_id in enumerate(token_ids):
+            outcome_price = _to_float(prices[index]) if index < len(prices) else None
+            if index == 0:
+                quote = TokenQuote(token_id, best_bid, best_ask, last_trade, outcome_price, now)
+            else:
+                quote = TokenQuote(token_id, _complement(best_ask), _complement(best_bid),
+                                   _complement(last_trade), outcome_price, now)
+            self._quotes[token_id] = quote
+
+    def forget_event(self, event_slug: str, keep_tokens: Container[str] = ()) -> None:
+        """Drop the event and its token quotes (except keep_tokens, refreshed on their own)"""
+        entry = self._events.pop(event_slug, None)
+        if entry is not None:
+            self.forget_tokens(t for t in _event_token_ids(entry[0]) if t not in keep_tokens)
+
+    def forget_tokens(self, token_ids: Iterable[str]) -> None:
+        for token_id in token_ids:
+            self._quotes.pop(token_id, None)
+
+    def event_token_ids(self) -> Set[str]:
+        """Tokens whose quotes come from a stored event snapshot"""
+        return {token_id for market, _, _ in self._events.values() for token_id in _event_token_ids(market)}
+
+    def stats(self) -> Dict[str, int]:
+        return {"events": len(self._events), "tokens": len(self._quotes)}
+
+
+class _Tracked:
+    __slots__ = ("start_time", "next_refresh")
+
+    def __init__(self, start_time: Optional[float]):
+        self.start_time = start_time
+        self.next_refresh = 0.0
+
+
+class MarketSnapshotRefresher:
+    """
+    Periodically refreshes tracked event slugs and DB-linked tokens into a MarketSnapshotTable
+
+    Event slugs are tracked once they are requested through the market endpoints;
+    tokens come from active rows in polymarket_markets (synced from the DB).
+    """
+
+    def __init__(self, table: MarketSnapshotTable, market_client: Optional[PolymarketMarketClient] = None):
+        self.table = table
+        self.market_client = market_client or PolymarketMarketClient()
+        self._events: Dict[str, _Tracked] = {}
+        self._tokens: Dict[str, _Tracked] = {}
+        self._next_db_sync = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def track(self, event_slug: str, start_time: Optional[float] = None) -> None:
+        """Start refreshing event_slug (first refresh on the next tick)"""
+        if event_slug not in self._events:
+            self._events[event_slug] = _Tracked(start_time or _parse_start_time(None, event_slug))
+
+    def record(self, event_slug: str, market: Optional[Dict[str, Any]]) -> None:
+        """Store a market fetched on the request path and start tracking its slug"""
+        if market is None:
+            return
+        self.track(event_slug)
+        tracked = self._events[event_slug]
+        tracked.start_time = _parse_start_time(market.get("startTime"), event_slug) or tracked.start_time
+        interval = refresh_interval(tracked.start_time)
+        tracked.next_refresh = time.time() + interval
+        self.table.put_event(event_slug, market, max_age=interval * 3)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Market snapshot refresh failed")
+            await asyncio.sleep(settings.MARKET_SNAPSHOT_TICK)
+
+    async def refresh_due(self) -> None:
+        now = time.time()
+        if now >= self._next_db_sync:
+            self._next_db_sync = now + settings.MARKET_SNAPSHOT_DB_SYNC_INTERVAL
+            await self._sync_tokens_from_db()
+
+        due_slugs = [slug for slug, tracked in self._events.items() if tracked.next_refresh <= now]
+        due_tokens = [token for token, tracked in self._tokens.items() if tracked.next_refresh <= now]
+        await asyncio.gather(self._refresh_events(due_slugs), self._refresh_tokens(due_tokens))
+
+    async def _refresh_events(self, event_slugs: List[str]) -> None:
+        if not event_slugs:
+            return
+        markets, errors = await self.market_client.search_markets_by_slugs(
+            event_slugs, max_concurrency=settings.MARKET_BATCH_CONCURRENCY
+        )
+        now = time.time()
+        for slug, market in markets.items():
+            if market is None:
+                # Unknown or delisted event: stop polling it
+                self._forget_event(slug)
+            else:
+                self.record(slug, market)
+        for slug in errors:
+            tracked = self._events.get(slug)
+            if tracked is not None:
+                tracked.next_refresh = now + settings.MARKET_SNAPSHOT_INTERVAL_LIVE
+
+        # Games finished long ago drop out of the table
+        cutoff = now - settings.MARKET_SNAPSHOT_RETENTION
+        for slug in [s for s, t in self._events.items() if t.start_time is not None and t.start_time < cutoff]:
+            self._forget_event(slug)
+
+    def _forget_event(self, event_slug: str) -> None:
+        self._events.pop(event_slug, None)
+        self.table.forget_event(event_slug, keep_tokens=self._tokens)
+
+    async def _refresh_tokens(self, token_ids: List[str]) -> None:
+        chunk_size = settings.MARKET_SNAPSHOT_TOKEN_CHUNK
+        chunks = [token_ids[i:i + chunk_size] for i in range(0, len(token_ids), chunk_size)]
+        results = await asyncio.gather(
+            *(self.market_client.fetch_markets_by_token_ids(chunk) for chunk in chunks),
+            return_exceptions=True
+        )
+        now = time.time()
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                logger.warning("Token snapshot refresh failed for %d tokens: %s", len(chunk), result)
+                continue
+            for market in result:
+                self.table.put_gamma_market(market)
+            for token_id in chunk:
+                tracked = self._tokens.get(token_id)
+                if tracked is not None:
+                    tracked.next_refresh = now + refresh_interval(tracked.start_time, now)
+
+    async def _sync_tokens_from_db(self) -> None:
+        rows = await run_blocking(_load_active_tokens)
+        tokens: Dict[str, _Tracked] = {}
+        for token_id, start_time in rows:
+            tracked = self._tokens.get(token_id) or _Tracked(None)
+            tracked.start_time = start_time.timestamp() if start_time else None
+            tokens[token_id] = tracked
+        dropped = self._tokens.keys() - tokens.keys()
+        self._tokens = tokens
+        if dropped:
+            # Inactive or past markets: drop their quotes unless a tracked event still covers them
+            self.table.forget_tokens(dropped - self.table.event_token_ids())
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.table.stats(), "tracked_events": len(self._events), "tracked_tokens": len(self._tokens)}
+
+
+def _load_active_tokens() -> List[tuple]:
+    cutoff = datetime.now(timezone.utc).timestamp() - settings.MARKET_SNAPSHOT_RETENTION
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(PolymarketMarket.token_id, Match.start_time)
+            .join(Match, PolymarketMarket.match_id == Match.id)
+            .filter(PolymarketMarket.status == "active")
+            .filter(Match.start_time >= datetime.fromtimestamp(cutoff, timezone.utc))
+            .all()
+        )
+        return [(token_id, start_time) for token_id, start_time in rows]
+    finally:
+        db.close()
+
+
+snapshot_table = MarketSnapshotTable()
+snapshot_refresher = MarketSnapshotRefresher(snapshot_table)
@@ -0,0 +1,149 @@
+"""
+Order preview: expected fill, slippage and fee from the cached order book
+
+The book side an order would take is turned into cumulative size/notional
+arrays once; each requested size is then resolved with a binary search, so a
+whole ladder of sizes costs one pass over the book plus O(log levels) each.
+"""
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.polymarket.orderbook_feed import BUY, SELL, OrderBook
+
+_EPS = 1e-9
+
+
+class BookWalk:
+    """Cumulative liquidity of one book side, best level first"""
+
+    def __init__(self, prices: List[float], sizes: List[float]):
+        self.prices = prices
+        self.cum_size = list(accumulate(sizes))
+        self.cum_notional = list(accumulate(price * size for price, size in zip(prices, sizes)))
+
+    @property
+    def total_size(self) -> float:
+        return self.cum_size[-1] if self.cum_size else 0.0
+
+    def fill(self, size: float) -> Tuple[float, float, Optional[float]]:
+        """(filled size, notional, worst price touched) for taking `size` shares"""
+        if not self.prices or size <= 0:
+            return 0.0, 0.0, None
+        index = bisect_left(self.cum_size, size - _EPS)
+        if index >= len(self.prices):
+            return self.cum_size[-1], self.cum_notional[-1], self.prices[-1]
+        prev_size = self.cum_size[index - 1] if index else 0.0
+        prev_notional = self.cum_notional[index - 1] if index else 0.0
+        return size, prev_notional + (size - prev_size) * self.prices[index], self.prices[index]
+
+    def size_for_notional(self, notional: float) -> float:
+        """Shares obtainable by spending `notional` (market BUY amount in USDC)"""
+        if not self.prices or notional <= 0:
+            return 0.0
+        index = bisect_left(self.cum_notional, notional - _EPS)
+        if index >= len(self.prices):
+            return self.cum_size[-1]
+        prev_size = self.cum_size[index - 1] if index else 0.0
+        prev_notional = self.cum_notional[index - 1] if index else 0.0
+        return prev_size + (notional - prev_notional) / self.prices[index]
+
+
+def _marketable(prices: List[float], side: str, limit_price: Optional[float]) -> int:
+    """Number of best-first levels a limit order at limit_price can take"""
+    if limit_price is None:
+        return len(prices)
+    if side == BUY:
+        return next((i for i, price in enumerate(prices) if price > limit_price + _EPS), len(prices))
+    return next((i for i, price in enumerate(prices) if price < limit_price - _EPS), len(prices))
+
+
+def estimate_fee(price: Optional[float], size: float) -> float:
+    """CLOB fee model: rate * min(price, 1 - price) * shares"""
+    if not price or size <= 0:
+        return 0.0
+    return settings.POLY_FEE_RATE_BPS / 10000 * min(price, 1 - price) * size
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 6) if value is not None else None
+
+
+def _estimate(walk: BookWalk, side: str, size: float, mid: Optional[float], limit_price: Optional[float]) -> Dict[str, Any]:
+    filled, notional, worst = walk.fill(size)
+    avg_price = notional / filled if filled else None
+    slippage = None
+    if avg_price is not None and mid:
+        slippage = avg_price - mid if side == BUY else mid - avg_price
+
+    resting = size - filled if limit_price is not None else 0.0
+    fee = estimate_fee(avg_price, filled) + estimate_fee(limit_price, resting)
+    return {
+        "size": _round(size),
+        "fillable_size": _round(filled),
+        "unfilled_size": _round(size - filled),
+        "avg_price": _round(avg_price),
+        "worst_price": worst,
+        "slippage": _round(slippage),
+        "slippage_bps": round(slippage / mid * 10000, 2) if slippage is not None else None,
+        "estimated_fee": _round(fee),
+        # BUY: USDC paid; SELL: USDC received. Resting limit remainder valued at the limit price
+        "total_cost": _round(notional + resting * (limit_price or 0.0)),
+    }
+
+
+def build_order_preview(
+    book: OrderBook,
+    side: str,
+    order_type: str,
+    price: Optional[float] = None,
+    size: Optional[float] = None,
+    amount: Optional[float] = None,
+    sizes: Optional[List[float]] = None,
+) -> Dict[str, Any]:
+    """
+    Preview an order (or a ladder of sizes) against `book`
+
+    LIMIT orders only take levels at or better than `price`; the rest rests.
+    MARKET BUY `amount` is USDC to spend, MARKET SELL `amount` is shares.
+    """
+    side = side.upper()
+    order_type = order_type.upper()
+    if side not in (BUY, SELL):
+        raise ValueError("side must be BUY or SELL")
+    if order_type not in ("LIMIT", "MARKET"):
+        raise ValueError("order_type must be LIMIT or MARKET")
+    limit_price = price if order_type == "LIMIT" else None
+    if order_type == "LIMIT" and (limit_price is None or not 0 < limit_price < 1):
+        raise ValueError("LIMIT orders require 0 < price < 1")
+
+    prices, level_sizes = book.levels_taken_by(side)
+    count = _marketable(prices, side, limit_price)
+    walk = BookWalk(prices[:count], level_sizes[:count])
+
+    if size is None and amount is not None:
+        size = walk.size_for_notional(amount) if side == BUY and order_type == "MARKET" else amount
+    if not size and not sizes:
+        raise ValueError("size or amount is required")
+
+    best_bid, best_ask = book.best_bid, book.best_ask
+    mid = (best_bid + best_ask) / 2 if best_bid is not None and best_ask is not None else None
+
+    preview = {
+        "token_id": book.token_id,
+        "side": side,
+        "order_type": order_type,
+        "price": price,
+        "amount": amount,
+        "best_bid": best_bid,
+        "best_ask": best_ask,
+        "mid": _round(mid),
+        "available_size": _round(walk.total_size),
+        "book_timestamp": book.timestamp,
+    }
+    if size:
+        preview.update(_estimate(walk, side, size, mid, limit_price))
+    if sizes:
+        preview["ladder"] = [_estimate(walk, side, ladder_size, mid, limit_price) for ladder_size in sizes if ladder_size > 0]
+    return preview
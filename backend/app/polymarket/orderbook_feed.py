@@ -0,0 +1,475 @@
+"""
+Order book engine fed by the Polymarket CLOB market websocket channel
+
+Keeps one in-memory book per subscribed token, built from `book` snapshots and
+`price_change` level deltas, so GET /orderbook/{token_id} does not hit the CLOB
+REST API on every poll. Subscriptions are reference-counted by viewers and
+dropped once a token has had no viewers for ORDERBOOK_IDLE_TTL seconds.
+"""
+import asyncio
+import bisect
+import json
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BUY = "BUY"
+SELL = "SELL"
+
+
+def _fmt(value: float) -> str:
+    """Render a price/size the way the CLOB REST API does ("0.45", "1200")"""
+    text = f"{value:.6f}".rstrip("0").rstrip(".")
+    return text or "0"
+
+
+def _bucket(price: float, tick: float, round_up: bool) -> float:
+    """Snap price to a multiple of tick (bids round down, asks round up)"""
+    steps = price / tick
+    steps = math.ceil(steps - 1e-9) if round_up else math.floor(steps + 1e-9)
+    return round(steps * tick, 6)
+
+
+def _levels(raw: Optional[Iterable[Dict[str, Any]]]) -> Iterable[tuple]:
+    for level in raw or []:
+        try:
+            yield float(level["price"]), float(level["size"])
+        except (KeyError, TypeError, ValueError):
+            continue
+
+
+class OrderBook:
+    """Price-level book for one token; prices are kept in sorted arrays for ordered reads"""
+
+    def __init__(self, token_id: str):
+        self.token_id = token_id
+        self.market: Optional[str] = None
+        self.hash: Optional[str] = None
+        self.timestamp: Optional[str] = None
+        self.tick_size: Optional[str] = None
+        self.last_trade_price: Optional[str] = None
+        self.updated_at = 0.0
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self._bid_prices: List[float] = []  # ascending
+        self._ask_prices: List[float] = []  # ascending
+
+    def apply_snapshot(self, bids, asks, market: Optional[str] = None,
+                       timestamp: Optional[str] = None, book_hash: Optional[str] = None) -> None:
+        self.bids = {price: size for price, size in _levels(bids) if size > 0}
+        self.asks = {price: size for price, size in _levels(asks) if size > 0}
+        self._bid_prices = sorted(self.bids)
+        self._ask_prices = sorted(self.asks)
+        self.market = market or self.market
+        self.timestamp = timestamp
+        self.hash = book_hash
+        self.updated_at = time.time()
+
+    def apply_level(self, side: str, price: float, size: float) -> None:
+        """Set the aggregate size at one price level (size 0 removes the level)"""
+        if side.upper() == BUY:
+            levels, prices = self.bids, self._bid_prices
+        else:
+            levels, prices = self.asks, self._ask_prices
+        if size <= 0:
+            if levels.pop(price, None) is not None:
+                index = bisect.bisect_left(prices, price)
+                if index < len(prices) and prices[index] == price:
+                    del prices[index]
+        else:
+            if price not in levels:
+                bisect.insort(prices, price)
+            levels[price] = size
+        self.updated_at = time.time()
+
+    @classmethod
+    def from_rest(cls, data: Dict[str, Any]) -> "OrderBook":
+        """Build a book from a CLOB GET /book response"""
+        book = cls(data.get("asset_id", ""))
+        book.apply_snapshot(data.get("bids"), data.get("asks"), market=data.get("market"),
+                            timestamp=data.get("timestamp"), book_hash=data.get("hash"))
+        book.tick_size = data.get("tick_size")
+        book.last_trade_price = data.get("last_trade_price")
+        return book
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self._bid_prices[-1] if self._bid_prices else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self._ask_prices[0] if self._ask_prices else None
+
+    def levels_taken_by(self, side: str) -> tuple:
+        """(prices, sizes) of the liquidity a BUY/SELL order takes, best level first"""
+        if side.upper() == BUY:
+            prices = list(self._ask_prices)
+            return prices, [self.asks[p] for p in prices]
+        prices = self._bid_prices[::-1]
+        return prices, [self.bids[p] for p in prices]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Same shape as CLOB GET /book (bids ascending, asks descending: best level last)"""
+        return {
+            "market": self.market,
+            "asset_id": self.token_id,
+            "timestamp": self.timestamp,
+            "hash": self.hash,
+            "bids": [{"price": _fmt(p), "size": _fmt(self.bids[p])} for p in self._bid_prices],
+            "asks": [{"price": _fmt(p), "size": _fmt(self.asks[p])} for p in reversed(self._ask_prices)],
+            "tick_size": self.tick_size,
+            "last_trade_price": self.last_trade_price,
+        }
+
+    def depth_view(self, depth: Optional[int] = None, tick: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Top-N, optionally price-bucketed view with cumulative size/notional per level
+
+        Both sides are ordered best level first. Only the levels needed for
+        `depth` buckets are visited.
+        """
+        best_bid, best_ask = self.best_bid, self.best_ask
+        return {
+            "market": self.market,
+            "asset_id": self.token_id,
+            "timestamp": self.timestamp,
+            "hash": self.hash,
+            "bestBid": best_bid,
+            "bestAsk": best_ask,
+            "mid": round((best_bid + best_ask) / 2, 6) if best_bid is not None and best_ask is not None else None,
+            "spread": round(best_ask - best_bid, 6) if best_bid is not None and best_ask is not None else None,
+            "tick": tick,
+            "bids": _aggregate(reversed(self._bid_prices), self.bids, depth, tick, round_up=False),
+            "asks": _aggregate(self._ask_prices, self.asks, depth, tick, round_up=True),
+            "tick_size": self.tick_size,
+            "last_trade_price": self.last_trade_price,
+        }
+
+
+def _aggregate(prices: Iterable[float], sizes: Dict[float, float], depth: Optional[int],
+               tick: Optional[float], round_up: bool) -> List[Dict[str, float]]:
+    """Walk prices best-first, merging into tick buckets until `depth` levels are emitted"""
+    levels: List[Dict[str, float]] = []
+    cum_size = cum_notional = 0.0
+    level_price = None
+    level_size = level_notional = 0.0
+
+    for price in prices:
+        bucket = _bucket(price, tick, round_up) if tick else price
+        if bucket != level_price:
+            if level_price is not None:
+                cum_size += level_size
+                cum_notional += level_notional
+                levels.append({"price": level_price, "size": round(level_size, 6),
+                               "cumSize": round(cum_size, 6), "cumNotional": round(cum_notional, 6)})
+                if depth and len(levels) >= depth:
+                    return levels
+            level_price = bucket
+            level_size = level_notional = 0.0
+        size = sizes[price]
+        level_size += size
+        level_notional += size * price
+
+    if level_price is not None:
+        cum_size += level_size
+        cum_notional += level_notional
+        levels.append({"price": level_price, "size": round(level_size, 6),
+                       "cumSize": round(cum_size, 6), "cumNotional": round(cum_notional, 6)})
+    return levels
+
+
+class OrderBookFeed:
+    """Single upstream websocket connection shared by all order book viewers"""
+
+    def __init__(self, url: Optional[str] = None):
+        self.url = url or settings.POLY_CLOB_WS_URL
+        self.books: Dict[str, OrderBook] = {}
+        self._refs: Dict[str, int] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._subscribed: Set[str] = set()
+        # Tokens with a `book` snapshot on the current connection; books of other
+        # tokens missed updates (reconnect) and are neither served nor patched
+        self._synced: Set[str] = set()
+        self._snapshot_events: Dict[str, asyncio.Event] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._listeners: List[Callable[[OrderBook], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+
+        self.messages = 0
+        self.snapshots = 0
+        self.deltas = 0
+        self.reconnects = 0
+
+    def add_listener(self, listener: Callable[[OrderBook], None]) -> None:
+        """Call listener(book) after every message that changed a book"""
+        self._listeners.append(listener)
+
+    # --- viewers ---
+
+    def acquire(self, token_id: str) -> bool:
+        """Register a long-lived viewer of token_id; False if the token limit is reached"""
+        if not self.touch(token_id):
+            return False
+        self._refs[token_id] = self._refs.get(token_id, 0) + 1
+        return True
+
+    def release(self, token_id: str) -> None:
+        refs = self._refs.get(token_id, 0) - 1
+        if refs > 0:
+            self._refs[token_id] = refs
+        else:
+            self._refs.pop(token_id, None)
+        # Idle timer starts when the last viewer leaves
+        self._last_seen[token_id] = time.monotonic()
+
+    def touch(self, token_id: str) -> bool:
+        """Mark token_id as viewed (keeps it subscribed for ORDERBOOK_IDLE_TTL)"""
+        if token_id not in self._last_seen and len(self._last_seen) >= settings.ORDERBOOK_MAX_TOKENS:
+            self._drop_idle()
+            if len(self._last_seen) >= settings.ORDERBOOK_MAX_TOKENS:
+                return False
+        self._last_seen[token_id] = time.monotonic()
+        if token_id not in self._subscribed and self._wake is not None:
+            self._wake.set()
+        return True
+
+    def is_live(self, token_id: str) -> bool:
+        book = self.books.get(token_id)
+        return (self.connected and token_id in self._synced and token_id in self._subscribed
+                and book is not None and book.updated_at > 0)
+
+    async def get_book(self, token_id: str, wait: Optional[float] = None) -> Optional[OrderBook]:
+        """
+        Current book for token_id, subscribing on first use
+
+        Waits up to `wait` seconds for the initial snapshot while the socket is
+        up; returns None if the feed cannot serve the token (caller falls back
+        to the REST API).
+        """
+        if not self.touch(token_id):
+            return None
+        if not self.is_live(token_id):
+            # Disconnected (or not started): no snapshot can arrive before the timeout
+            if self._task is None or not self.connected:
+                return None
+            event = self._snapshot_events.setdefault(token_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), settings.ORDERBOOK_SNAPSHOT_WAIT if wait is None else wait)
+            except asyncio.TimeoutError:
+                return None
+            if not self.is_live(token_id):
+                return None
+        return self.books[token_id]
+
+    def _wanted(self) -> Set[str]:
+        return {token_id for token_id in self._last_seen if self._is_wanted(token_id)}
+
+    def _is_wanted(self, token_id: str) -> bool:
+        if self._refs.get(token_id):
+            return True
+        return time.monotonic() - self._last_seen.get(token_id, 0.0) < settings.ORDERBOOK_IDLE_TTL
+
+    def _drop_idle(self) -> None:
+        for token_id in [t for t in self._last_seen if not self._is_wanted(t)]:
+            self._last_seen.pop(token_id, None)
+            self.books.pop(token_id, None)
+            self._snapshot_events.pop(token_id, None)
+            self._synced.discard(token_id)
+
+    # --- lifecycle ---
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.connected = False
+        self._subscribed.clear()
+        self._synced.clear()
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            self._drop_idle()
+            if not self._wanted():
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), settings.ORDERBOOK_IDLE_TTL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                async with connect(self.url, open_timeout=settings.HTTP_CONNECT_TIMEOUT) as ws:
+                    backoff = 1.0
+                    await self._session(ws)
+                # Closed because no token is viewed any more
+                continue
+            except asyncio.CancelledError:
+                raise
+            except (OSError, ConnectionClosed, asyncio.TimeoutError) as e:
+                logger.warning("Order book feed disconnected: %s", e)
+            except Exception:
+                logger.exception("Order book feed failed")
+            finally:
+                self.connected = False
+                self._subscribed.clear()
+                self._synced.clear()
+            self.reconnects += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def _session(self, ws) -> None:
+        tokens = sorted(self._wanted())
+        await ws.send(json.dumps({"assets_ids": tokens, "type": "market"}))
+        self._subscribed = set(tokens)
+        self.connected = True
+        logger.info("Order book feed connected, %d tokens", len(tokens))
+
+        next_ping = time.monotonic() + settings.ORDERBOOK_WS_PING_INTERVAL
+        while True:
+            try:
+                raw = await asyncio.wait_for(ws.recv(), settings.ORDERBOOK_WS_TICK)
+            except asyncio.TimeoutError:
+                raw = None
+            if raw is not None:
+                self._handle_raw(raw)
+
+            now = time.monotonic()
+            if now >= next_ping:
+                await ws.send("PING")
+                next_ping = now + settings.ORDERBOOK_WS_PING_INTERVAL
+
+            if not await self._sync_subscriptions(ws):
+                return
+
+    async def _sync_subscriptions(self, ws) -> bool:
+        """Subscribe newly viewed tokens, unsubscribe idle ones; False once nothing is wanted"""
+        self._drop_idle()
+        wanted = self._wanted()
+        if not wanted:
+            logger.info("Order book feed idle, closing connection")
+            return False
+        added = sorted(wanted - self._subscribed)
+        removed = sorted(self._subscribed - wanted)
+        if added:
+            await ws.send(json.dumps({"assets_ids": added, "operation": "subscribe"}))
+            self._subscribed.update(added)
+        if removed:
+            await ws.send(json.dumps({"assets_ids": removed, "operation": "unsubscribe"}))
+            self._subscribed.difference_update(removed)
+            for token_id in removed:
+                self.books.pop(token_id, None)
+                self._synced.discard(token_id)
+        return True
+
+    # --- message handling ---
+
+    def _handle_raw(self, raw) -> None:
+        if raw in ("PONG", "PING", b"PONG"):
+            return
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            logger.debug("Order book feed: non-JSON message %r", raw[:100])
+            return
+        for message in payload if isinstance(payload, list) else [payload]:
+            if isinstance(message, dict):
+                self.messages += 1
+                changed = self.handle_message(message)
+                self._notify(changed)
+
+    def _notify(self, books: Iterable[OrderBook]) -> None:
+        for book in books:
+            for listener in self._listeners:
+                try:
+                    listener(book)
+                except Exception:
+                    logger.exception("Order book listener failed")
+
+    def handle_message(self, message: Dict[str, Any]) -> List[OrderBook]:
+        """Apply one channel message; returns the books it changed"""
+        event_type = message.get("event_type")
+        changed: Dict[str, OrderBook] = {}
+        if event_type == "book":
+            token_id = message.get("asset_id")
+            if token_id not in self._subscribed:
+                return []
+            book = self.books.get(token_id) or OrderBook(token_id)
+            book.apply_snapshot(
+                message.get("bids", message.get("buys")),
+                message.get("asks", message.get("sells")),
+                market=message.get("market"),
+                timestamp=message.get("timestamp"),
+                book_hash=message.get("hash"),
+            )
+            self.books[token_id] = book
+            self._synced.add(token_id)
+            changed[token_id] = book
+            self.snapshots += 1
+            event = self._snapshot_events.pop(token_id, None)
+            if event is not None:
+                event.set()
+        elif event_type == "price_change":
+            # Current format: price_changes[] with asset_id per change; older: asset_id + changes[]
+            changes = message.get("price_changes")
+            if changes is None:
+                changes = [{**change, "asset_id": message.get("asset_id")} for change in message.get("changes") or []]
+            for change in changes:
+                token_id = change.get("asset_id")
+                # Until the token's snapshot on this connection, its old book is missing updates
+                if token_id not in self._synced:
+                    continue
+                book = self.books.get(token_id)
+                if book is None:
+                    continue
+                try:
+                    book.apply_level(change["side"], float(change["price"]), float(change["size"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+                book.timestamp = message.get("timestamp", book.timestamp)
+                book.hash = change.get("hash", book.hash)
+                changed[book.token_id] = book
+                self.deltas += 1
+        elif event_type == "tick_size_change":
+            book = self.books.get(message.get("asset_id"))
+            if book is not None:
+                book.tick_size = message.get("new_tick_size")
+        elif event_type == "last_trade_price":
+            book = self.books.get(message.get("asset_id"))
+            if book is not None:
+                book.last_trade_price = message.get("price")
+                if book.token_id in self._synced:
+                    changed[book.token_id] = book
+        return list(changed.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "subscribed": len(self._subscribed),
+            "books": len(self.books),
+            "viewers": sum(self._refs.values()),
+            "messages": self.messages,
+            "snapshots": self.snapshots,
+            "deltas": self.deltas,
+            "reconnects": self.reconnects,
+        }
+
+
+orderbook_feed = OrderBookFeed()
@@ -0,0 +1,80 @@
+"""
+Marked-to-market portfolio from CLOB balances and cached prices
+
+Prices come only from what is already in memory (live order book feed, then
+the market snapshot table), so valuing a portfolio never calls an upstream.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.polymarket.market_snapshots import snapshot_table
+from app.polymarket.orderbook_feed import orderbook_feed
+
+# USDC and outcome tokens both use 6 decimals on the CLOB
+BALANCE_DECIMALS = 6
+
+
+def to_units(raw: Any) -> float:
+    """CLOB balance string (base units) -> shares / USDC"""
+    try:
+        return int(raw) / 10 ** BALANCE_DECIMALS
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def cached_mark(token_id: str) -> Tuple[Optional[float], Optional[str]]:
+    """(mark price, source) for token_id from in-memory data, or (None, None)"""
+    if orderbook_feed.is_live(token_id):
+        book = orderbook_feed.books[token_id]
+        best_bid, best_ask = book.best_bid, book.best_ask
+        if best_bid is not None and best_ask is not None:
+            return (best_bid + best_ask) / 2, "orderbook"
+
+    quote = snapshot_table.get_quote(token_id)
+    if quote is not None:
+        if quote.mid is not None:
+            return quote.mid, "snapshot"
+        if quote.last_trade_price is not None:
+            return quote.last_trade_price, "last_trade"
+        if quote.outcome_price is not None:
+            return quote.outcome_price, "outcome_price"
+    return None, None
+
+
+def build_portfolio(collateral: Optional[Dict[str, Any]], positions: Iterable[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    collateral: /balance-allowance response for COLLATERAL (None if it failed)
+    positions: (token_id, /balance-allowance response) for CONDITIONAL tokens
+
+    Zero balances are left out; positions without a cached price have value None
+    and are not counted in positions_value.
+    """
+    cash = to_units(collateral.get("balance")) if collateral else None
+    rows: List[Dict[str, Any]] = []
+    positions_value = 0.0
+    unpriced = 0
+    for token_id, balance in positions:
+        size = to_units(balance.get("balance"))
+        if size <= 0:
+            continue
+        mark, source = cached_mark(token_id)
+        value = size * mark if mark is not None else None
+        if value is None:
+            unpriced += 1
+        else:
+            positions_value += value
+        rows.append({
+            "token_id": token_id,
+            "size": round(size, 6),
+            "mark_price": round(mark, 6) if mark is not None else None,
+            "price_source": source,
+            "value": round(value, 6) if value is not None else None,
+        })
+
+    rows.sort(key=lambda row: row["value"] or 0.0, reverse=True)
+    return {
+        "cash": round(cash, 6) if cash is not None else None,
+        "positions_value": round(positions_value, 6),
+        "total_value": round((cash or 0.0) + positions_value, 6),
+        "unpriced_positions": unpriced,
+        "positions": rows,
+    }
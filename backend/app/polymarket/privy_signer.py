@@ -5,6 +5,7 @@ Handles signing operations for Privy embedded wallets using Privy API
 from typing import Optional
 from app.models.user import User
 from app.core.config import settings
+from app.core.http import upstreams, PRIVY
 import httpx
 import base64
 
@@ -93,10 +94,9 @@ class PrivySigner:
             
             # Get user's wallet ID from Privy
             # First, get user info to find the wallet
-            user_response = httpx.get(
+            user_response = upstreams.get_sync(PRIVY).get(
                 f"{self.privy_api_url}/users/{self.user.did}",
-                headers=headers,
-                timeout=10.0
+                headers=headers
             )
             
             if user_response.status_code != 200:
@@ -126,11 +126,10 @@ class PrivySigner:
                 "messageType": "hash"  # Indicate this is a hash, not a raw message
             }
             
-            sign_response = httpx.post(
+            sign_response = upstreams.get_sync(PRIVY).post(
                 f"{self.privy_api_url}/wallets/{wallet_id}/sign",
                 headers=headers,
-                json=sign_payload,
-                timeout=10.0
+                json=sign_payload
             )
             
             if sign_response.status_code == 200:
@@ -5,6 +5,7 @@ Attempts to export embedded wallet private keys from Privy API
 from typing import Optional
 from app.models.user import User
 from app.core.config import settings
+from app.core.http import upstreams, PRIVY
 import httpx
 import base64
 
@@ -47,10 +48,9 @@ def export_wallet_private_key(user: User, wallet_address: str) -> Optional[str]:
         }
         
         # First, get user's wallets
-        user_response = httpx.get(
+        user_response = upstreams.get_sync(PRIVY).get(
             f"{settings.PRIVY_API_URL}/users/{user.did}",
-            headers=headers,
-            timeout=10.0
+            headers=headers
         )
         
         if user_response.status_code != 200:
@@ -77,10 +77,9 @@ def export_wallet_private_key(user: User, wallet_address: str) -> Optional[str]:
         
         # Try to export wallet
         # Note: This endpoint may not be available for all Privy plans
-        export_response = httpx.post(
+        export_response = upstreams.get_sync(PRIVY).post(
             f"{settings.PRIVY_API_URL}/wallets/{wallet_id}/export",
-            headers=headers,
-            timeout=10.0
+            headers=headers
         )
         
         if export_response.status_code == 200:
@@ -4,15 +4,15 @@ Based on: https://docs.polymarket.com/developers/builders/builder-signing-server
 and https://github.com/Polymarket/py-builder-relayer-client
 """
 from typing import Dict, Optional
-import httpx
 from app.core.config import settings
+from app.core.http import upstreams, RELAYER
 from app.polymarket.builder_headers import generate_builder_headers
 
 class PolymarketRelayerClient:
     def __init__(self):
         self.base_url = settings.POLY_RELAYER_URL
         
-    def _request(self, method: str, path: str, body: Optional[dict] = None) -> dict:
+    async def _request(self, method: str, path: str, body: Optional[dict] = None) -> dict:
         """Make authenticated request to relayer API"""
         url = f"{self.base_url}{path}"
         body_str = ""
@@ -22,16 +22,16 @@ class PolymarketRelayerClient:
         
         headers = generate_builder_headers(method, path, body_str)
         
-        with httpx.Client() as client:
-            if method == "GET":
-                response = client.get(url, headers=headers)
-            elif method == "POST":
-                response = client.post(url, headers=headers, json=body)
-            else:
-                raise ValueError(f"Unsupported method: {method}")
-            
-            response.raise_for_status()
-            return response.json()
+        client = upstreams.get(RELAYER)
+        if method == "GET":
+            response = await client.get(url, headers=headers)
+        elif method == "POST":
+            response = await client.post(url, headers=headers, json=body)
+        else:
+            raise ValueError(f"Unsupported method: {method}")
+        
+        response.raise_for_status()
+        return response.json()
     
     def deploy_safe(self, user_address: str) -> Dict:
         """
@@ -0,0 +1,173 @@
+"""
+Fan-out of live prices to streaming clients (SSE / WebSocket)
+
+One shared upstream (the order book feed and the market snapshot refresher)
+publishes into the hub; every connection gets a coalescing mailbox that keeps
+only the latest update per key, so a slow consumer skips intermediate updates
+instead of buffering them (drop-to-latest).
+"""
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.polymarket.market_snapshots import MarketSnapshotRefresher, MarketSnapshotTable, snapshot_refresher, snapshot_table
+from app.polymarket.orderbook_feed import OrderBook, OrderBookFeed, orderbook_feed
+
+TOKEN = "token"
+EVENT = "event"
+
+Key = Tuple[str, str]
+
+_MARKET_FIELDS = ("tokenId", "homeTokenId", "awayPrice", "homePrice", "bestBid", "bestAsk", "lastTradePrice", "active")
+
+
+def _top_of_book(book: OrderBook) -> Dict[str, Any]:
+    best_bid = book.best_bid
+    best_ask = book.best_ask
+    return {
+        "type": "book",
+        "tokenId": book.token_id,
+        "bestBid": best_bid,
+        "bidSize": book.bids.get(best_bid) if best_bid is not None else None,
+        "bestAsk": best_ask,
+        "askSize": book.asks.get(best_ask) if best_ask is not None else None,
+        "lastTradePrice": book.last_trade_price,
+    }
+
+
+def _market_update(event_slug: str, market: Dict[str, Any]) -> Dict[str, Any]:
+    update = {"type": "market", "eventSlug": event_slug}
+    update.update({field: market.get(field) for field in _MARKET_FIELDS})
+    return update
+
+
+class Subscriber:
+    """One streaming connection: subscribed keys plus a latest-value mailbox"""
+
+    def __init__(self):
+        self.keys: Set[Key] = set()
+        self._pending: Dict[Key, Dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def offer(self, key: Key, update: Dict[str, Any]) -> None:
+        if key in self._pending:
+            # Consumer has not caught up: replace the queued update with the newer one
+            self.dropped += 1
+        self._pending[key] = update
+        self._ready.set()
+
+    async def next_batch(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Wait for pending updates and take them all; [] on timeout"""
+        if not self._pending:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        batch = list(self._pending.values())
+        self._pending = {}
+        return batch
+
+
+class StreamHub:
+    """Routes upstream updates to subscribers by token ID / event slug"""
+
+    def __init__(self, feed: OrderBookFeed, table: MarketSnapshotTable, refresher: MarketSnapshotRefresher):
+        self.feed = feed
+        self.table = table
+        self.refresher = refresher
+        self._subscribers: Dict[Key, Set[Subscriber]] = {}
+        self._last: Dict[Key, Dict[str, Any]] = {}
+        self.connections = 0
+        self.published = 0
+        feed.add_listener(self._on_book)
+        table.add_listener(self._on_market)
+
+    # --- upstream side ---
+
+    def _on_book(self, book: OrderBook) -> None:
+        key = (TOKEN, book.token_id)
+        if key in self._subscribers:
+            self._publish(key, _top_of_book(book))
+
+    def _on_market(self, event_slug: str, market: Dict[str, Any]) -> None:
+        key = (EVENT, event_slug)
+        if key in self._subscribers:
+            self._publish(key, _market_update(event_slug, market))
+
+    def _publish(self, key: Key, update: Dict[str, Any]) -> None:
+        # Only changes are fanned out: book deltas below the top level and
+        # unchanged snapshot refreshes are not pushed
+        if self._last.get(key) == update:
+            return
+        self._last[key] = update
+        self.published += 1
+        for subscriber in self._subscribers.get(key, ()):
+            subscriber.offer(key, update)
+
+    # --- connection side ---
+
+    def connect(self) -> Subscriber:
+        self.connections += 1
+        return Subscriber()
+
+    def disconnect(self, subscriber: Subscriber) -> None:
+        self.unsubscribe(subscriber, list(subscriber.keys))
+        self.connections -= 1
+
+    def subscribe(self, subscriber: Subscriber, token_ids: Iterable[str] = (), event_slugs: Iterable[str] = ()) -> List[str]:
+        """Add keys to a connection and queue their current state; returns rejected IDs"""
+        rejected = []
+        keys = [(TOKEN, token_id) for token_id in token_ids if token_id] + [(EVENT, slug) for slug in event_slugs if slug]
+        for key in keys:
+            if key in subscriber.keys:
+                continue
+            if len(subscriber.keys) >= settings.STREAM_MAX_KEYS_PER_CONNECTION:
+                rejected.append(key[1])
+                continue
+            kind, ident = key
+            if kind == TOKEN and not self.feed.acquire(ident):
+                rejected.append(ident)
+                continue
+            if kind == EVENT:
+                self.refresher.track(ident)
+            subscriber.keys.add(key)
+            self._subscribers.setdefault(key, set()).add(subscriber)
+
+            current = self._current(key)
+            if current is not None:
+                subscriber.offer(key, current)
+        return rejected
+
+    def unsubscribe(self, subscriber: Subscriber, keys: Iterable[Key]) -> None:
+        for key in keys:
+            if key not in subscriber.keys:
+                continue
+            subscriber.keys.discard(key)
+            subscribers = self._subscribers.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(key, None)
+                    self._last.pop(key, None)
+            if key[0] == TOKEN:
+                self.feed.release(key[1])
+
+    def _current(self, key: Key) -> Optional[Dict[str, Any]]:
+        kind, ident = key
+        if kind == TOKEN:
+            book = self.feed.books.get(ident)
+            return _top_of_book(book) if book is not None and self.feed.is_live(ident) else None
+        market = self.table.get_event(ident)
+        return _market_update(ident, market) if market is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": self.connections,
+            "keys": len(self._subscribers),
+            "published": self.published,
+        }
+
+
+stream_hub = StreamHub(orderbook_feed, snapshot_table, snapshot_refresher)
@@ -2,13 +2,17 @@
 User-specific CLOB Client factory
 Creates ClobClient instances for individual users with their L1 signer and L2 API creds
 """
+import logging
 from typing import Optional
 from app.models.user import User
 from app.core.config import settings
+from app.core.http import upstreams, PRIVY
 from app.polymarket.builder_headers import generate_builder_headers
 from app.polymarket.privy_signer import get_privy_signer_from_wallet_address
 import httpx
 
+logger = logging.getLogger(__name__)
+
 try:
     from py_clob_client.client import ClobClient
     from py_clob_client.clob_types import ApiCreds
@@ -20,7 +24,7 @@ except ImportError:
     ClobClient = None
     ApiCreds = None
     Signer = None
-    print("[UserClobClient] Warning: py_clob_client not available, using fallback")
+    logger.warning("[UserClobClient] Warning: py_clob_client not available, using fallback")
 
 
 def get_user_signer(user: User) -> Optional[object]:
@@ -46,7 +50,7 @@ def get_user_signer(user: User) -> Optional[object]:
         import httpx
         
         if not user.wallet_address:
-            print(f"[get_user_signer] No wallet address for user {user.did}")
+            logger.debug("[get_user_signer] No wallet address for user %s", user.did)
             return None
         
         # Try to get signer via Privy API
@@ -68,17 +72,16 @@ def get_user_signer(user: User) -> Optional[object]:
                 
                 # Get user info from Privy
                 # Privy API endpoint: /v1/users/{did}
-                response = httpx.get(
+                response = upstreams.get_sync(PRIVY).get(
                     f"{settings.PRIVY_API_URL}/users/{user.did}",
-                    headers=headers,
-                    timeout=10.0
+                    headers=headers
                 )
                 
                 if response.status_code == 200:
                     user_data = response.json()
                     wallets = user_data.get("wallets", [])
                     
-                    print(f"[get_user_signer] Privy API returned {len(wallets)} wallets for user {user.did}")
+                    logger.debug("[get_user_signer] Privy API returned %s wallets for user %s", len(wallets), user.did)
                     
                     if wallets:
                         # Find wallet matching user.wallet_address
@@ -88,56 +91,54 @@ def get_user_signer(user: User) -> Optional[object]:
                         )
                         
                         if not wallet:
-                            print(f"[get_user_signer] ⚠️ Wallet {user.wallet_address} not found in Privy wallets, using first wallet: {wallets[0].get('address')}")
+                            logger.warning("[get_user_signer] Wallet %s not found in Privy wallets, using first wallet: %s", user.wallet_address, wallets[0].get('address'))
                             wallet = wallets[0]
                         
                         if wallet:
                             wallet_address = wallet.get('address', '').lower()
                             wallet_type = wallet.get('walletClientType', '')
                             
-                            print(f"[get_user_signer] ✅ Found wallet for user {user.did}: {wallet_address}, type: {wallet_type}")
+                            logger.debug("[get_user_signer] Found wallet for user %s: %s, type: %s", user.did, wallet_address, wallet_type)
                             
                             # For embedded wallets, use PrivySigner that calls Privy API for signing
                             # No need to export private key - Privy handles signing server-side
                             # Accept any wallet type - PrivySigner will handle signing via API
-                            print(f"[get_user_signer] Creating PrivySigner for embedded wallet (no key export needed)")
+                            logger.debug("[get_user_signer] Creating PrivySigner for embedded wallet (no key export needed)")
                             from app.polymarket.privy_signer import get_privy_signer_from_wallet_address
                             privy_signer = get_privy_signer_from_wallet_address(user, settings.POLY_CHAIN_ID)
                             if privy_signer:
-                                print(f"[get_user_signer] ✅ Successfully got PrivySigner for user {user.did}")
+                                logger.debug("[get_user_signer] Successfully got PrivySigner for user %s", user.did)
                                 return privy_signer
                             else:
-                                print(f"[get_user_signer] ❌ Failed to create PrivySigner for user {user.did}")
+                                logger.warning("[get_user_signer] Failed to create PrivySigner for user %s", user.did)
                                 return None
                         else:
-                            print(f"[get_user_signer] ❌ Wallet not found in Privy response for user {user.did}")
+                            logger.warning("[get_user_signer] Wallet not found in Privy response for user %s", user.did)
                             return None
                 
                 elif response.status_code == 404:
-                    print(f"[get_user_signer] User {user.did} not found in Privy")
+                    logger.debug("[get_user_signer] User %s not found in Privy", user.did)
                 else:
-                    print(f"[get_user_signer] Privy API error: {response.status_code} - {response.text}")
+                    logger.debug("[get_user_signer] Privy API error: %s - %s", response.status_code, response.text[:500])
                     
             except httpx.RequestError as e:
-                print(f"[get_user_signer] Error calling Privy API: {e}")
+                logger.warning("[get_user_signer] Error calling Privy API: %s", e)
             except Exception as e:
-                print(f"[get_user_signer] Error processing Privy response: {e}")
+                logger.warning("[get_user_signer] Error processing Privy response: %s", e)
         else:
-            print(f"[get_user_signer] PRIVY_APP_SECRET not configured")
+            logger.debug("[get_user_signer] PRIVY_APP_SECRET not configured")
         
         # Fallback: If we can't get signer from Privy API,
         # we'll need to use frontend signing or alternative method
-        print(f"[get_user_signer] Could not get signer via Privy API for user {user.did}")
-        print(f"[get_user_signer] Note: For embedded wallets, consider using frontend signing")
+        logger.debug("[get_user_signer] Could not get signer via Privy API for user %s", user.did)
+        logger.debug("[get_user_signer] Note: For embedded wallets, consider using frontend signing")
         return None
         
     except ImportError as e:
-        print(f"[get_user_signer] Required packages not available: {e}")
+        logger.debug("[get_user_signer] Required packages not available: %s", e)
         return None
     except Exception as e:
-        print(f"[get_user_signer] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[get_user_signer] Error: %s", e)
         return None
 
 
@@ -156,15 +157,15 @@ def get_user_clob_client(user: User):
         ClobClient instance configured with L2 API creds and signer, or None if not available
     """
     if not PY_CLOB_AVAILABLE:
-        print("[UserClobClient] py_clob_client not available")
+        logger.debug("[UserClobClient] py_clob_client not available")
         return None
     
     if not user.trading_enabled:
-        print(f"[UserClobClient] Trading not enabled for user {user.did}")
+        logger.debug("[UserClobClient] Trading not enabled for user %s", user.did)
         return None
     
     if not user.clob_api_key or not user.clob_api_secret or not user.clob_api_passphrase:
-        print(f"[UserClobClient] L2 API creds not set for user {user.did}")
+        logger.debug("[UserClobClient] L2 API creds not set for user %s", user.did)
         return None
     
     try:
@@ -180,11 +181,11 @@ def get_user_clob_client(user: User):
             from app.polymarket.privy_signer import get_privy_signer_from_wallet_address
             privy_signer = get_privy_signer_from_wallet_address(user, settings.POLY_CHAIN_ID)
             if privy_signer:
-                print(f"[UserClobClient] PrivySigner available for user {user.did}")
+                logger.debug("[UserClobClient] PrivySigner available for user %s", user.did)
                 privy_signer_available = True
                 # We'll need to override the signer in the builder later
         except Exception as e:
-            print(f"[UserClobClient] Could not get PrivySigner: {e}")
+            logger.debug("[UserClobClient] Could not get PrivySigner: %s", e)
         
         # Create a dummy key for ClobClient initialization
         # ClobClient requires a key string, but for L2 API orders, the actual signing
@@ -211,11 +212,11 @@ def get_user_clob_client(user: User):
                 from app.polymarket.privy_signer import get_privy_signer_from_wallet_address
                 privy_signer = get_privy_signer_from_wallet_address(user, settings.POLY_CHAIN_ID)
                 if privy_signer and hasattr(client, 'builder') and client.builder:
-                    print(f"[UserClobClient] Replacing builder signer with PrivySigner for user {user.did}")
+                    logger.debug("[UserClobClient] Replacing builder signer with PrivySigner for user %s", user.did)
                     client.builder.signer = privy_signer
                     client.builder.funder = user.wallet_address
             except Exception as e:
-                print(f"[UserClobClient] Could not replace builder signer: {e}")
+                logger.debug("[UserClobClient] Could not replace builder signer: %s", e)
                 # Continue with dummy signer - may fail for order signing
         
         # Set L2 API creds - these are used for actual API authentication
@@ -226,13 +227,11 @@ def get_user_clob_client(user: User):
         )
         client.set_api_creds(api_creds)
         
-        print(f"[UserClobClient] Created ClobClient for user {user.did} with L2 API creds")
+        logger.debug("[UserClobClient] Created ClobClient for user %s with L2 API creds", user.did)
         return client
         
     except Exception as e:
-        print(f"[UserClobClient] Error creating client for user {user.did}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[UserClobClient] Error creating client for user %s: %s", user.did, e)
         return None
 
 
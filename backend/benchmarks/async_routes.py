@@ -0,0 +1,98 @@
+"""
+Load test: concurrent requests to async routes that call a slow upstream
+
+GET /api/polymarket/orderbook/{token_id} (REST fallback, websocket feed off)
+is driven in-process against a stub CLOB that answers after --latency
+seconds. Meanwhile a probe calls GET /health every 10 ms; its latency shows
+how long other users' requests wait for the event loop.
+
+- blocking: the stub sleeps on the event loop thread, which is what the old
+  synchronous httpx.get/post calls inside async handlers did
+- async: the stub awaits, as the pooled async clients do now
+
+Run from backend/ (needs the usual env / .env for Settings):
+
+    python -m benchmarks.async_routes --requests 200 --concurrency 50 --latency 0.05
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.core.config import settings
+from app.core.http import CLOB, upstreams
+from app.main import app
+
+BOOK = {"market": "bench", "asset_id": "bench", "bids": [{"price": "0.45", "size": "100"}],
+        "asks": [{"price": "0.55", "size": "100"}], "hash": "bench", "timestamp": "0"}
+
+
+def stub_clob(mode: str, latency: float) -> httpx.AsyncClient:
+    if mode == "blocking":
+        def handler(request):
+            time.sleep(latency)
+            return httpx.Response(200, json=BOOK)
+    else:
+        async def handler(request):
+            await asyncio.sleep(latency)
+            return httpx.Response(200, json=BOOK)
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] if values else 0.0
+
+
+async def run(mode: str, requests: int, concurrency: int, latency: float):
+    upstreams._clients[CLOB] = stub_clob(mode, latency)
+    semaphore = asyncio.Semaphore(concurrency)
+    probes = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def call(i: int):
+            async with semaphore:
+                (await client.get(f"/api/polymarket/orderbook/token-{i}")).raise_for_status()
+
+        async def probe():
+            # A cheap route another user calls every 10 ms, timed from when it was due
+            while not done.is_set():
+                due = time.perf_counter() + 0.01
+                await asyncio.sleep(0.01)
+                (await client.get("/health")).raise_for_status()
+                probes.append(time.perf_counter() - due)
+
+        probe_task = asyncio.ensure_future(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(call(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    await upstreams._clients.pop(CLOB).aclose()
+    return requests / elapsed, probes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub upstream response time (s)")
+    args = parser.parse_args()
+
+    settings.ORDERBOOK_WS_ENABLED = False
+    print(f"{args.requests} requests, concurrency {args.concurrency}, upstream latency {args.latency * 1000:.0f} ms")
+    print(f"{'upstream':<9} {'req/s':>8}   {'/health p50':>11} {'p95':>9} {'max':>9}")
+    for mode in ("blocking", "async"):
+        throughput, probes = asyncio.run(run(mode, args.requests, args.concurrency, args.latency))
+        print(
+            f"{mode:<9} {throughput:8.1f}   {statistics.median(probes) * 1000:9.1f}ms"
+            f" {percentile(probes, 0.95) * 1000:7.1f}ms {max(probes) * 1000:7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Micro-benchmark: per-request bearer token verification cost with and without
+the decoded-JWT cache (app.core.security.verify_token)
+
+Run from backend/ (needs the usual env / .env for Settings):
+
+    python -m benchmarks.auth_jwt --requests 20000 --tokens 50
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.core.config import settings
+from app.core.security import create_access_token, token_cache, verify_token
+
+
+def run(tokens, requests: int, cached: bool) -> list:
+    settings.JWT_CACHE_ENABLED = cached
+    token_cache.clear()
+    samples = []
+    for _ in range(requests):
+        token = random.choice(tokens)
+        started = time.perf_counter()
+        payload = verify_token(token)
+        samples.append(time.perf_counter() - started)
+        assert payload is not None
+    return samples
+
+
+def report(label: str, samples: list) -> None:
+    ordered = sorted(samples)
+    p = lambda q: ordered[int(q * (len(ordered) - 1))] * 1e6
+    print(
+        f"{label:<10} mean {statistics.mean(samples) * 1e6:8.2f} us   p50 {p(0.5):8.2f} us   "
+        f"p99 {p(0.99):8.2f} us   {len(samples) / sum(samples):12.0f} verifications/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--tokens", type=int, default=50, help="distinct active tokens (polling clients)")
+    args = parser.parse_args()
+
+    tokens = [
+        create_access_token({"sub": f"0x{i:040x}", "address": f"0x{i:040x}"})
+        for i in range(args.tokens)
+    ]
+    enabled = settings.JWT_CACHE_ENABLED
+    try:
+        report("no cache", run(tokens, args.requests, cached=False))
+        report("cache", run(tokens, args.requests, cached=True))
+    finally:
+        settings.JWT_CACHE_ENABLED = enabled
+
+
+if __name__ == "__main__":
+    main()
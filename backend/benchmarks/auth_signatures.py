@@ -0,0 +1,78 @@
+"""
+Synthetic login storm: SIWE signature recovery throughput
+
+Compares recovery inline on the event loop (the old behaviour) with the
+signature worker pool at 1, 2 and 4 workers. Process workers only scale up to
+the number of cores available to this process.
+
+Run from backend/ (needs the usual env / .env for Settings):
+
+    python -m benchmarks.auth_signatures --logins 400 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+from app.core.config import settings
+from app.core.signatures import SignatureWorkers, recover_personal_sign
+
+
+def make_logins(count: int):
+    logins = []
+    for i in range(count):
+        account = Account.create()
+        message = f"Sign this message to authenticate with Marketsport.\n\nAddress: {account.address.lower()}\nNonce: {i:064x}"
+        signature = account.sign_message(encode_defunct(text=message)).signature.hex()
+        logins.append((account.address.lower(), message, signature))
+    return logins
+
+
+async def storm(logins, pool: str, workers: int, concurrency: int):
+    settings.SIGNATURE_POOL = pool
+    settings.SIGNATURE_POOL_WORKERS = workers
+    signature_workers = SignatureWorkers()
+    semaphore = asyncio.Semaphore(concurrency)
+    lag = []
+
+    async def monitor():
+        # Event loop responsiveness: how late a 10 ms sleep wakes up
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag.append(time.perf_counter() - started - 0.01)
+
+    async def login(address, message, signature):
+        async with semaphore:
+            assert await signature_workers.run(recover_personal_sign, message, signature) == address
+
+    # Warm up (process start-up, imports) outside the measurement
+    await asyncio.gather(*(login(*entry) for entry in logins[:workers]))
+    monitor_task = asyncio.ensure_future(monitor())
+    started = time.perf_counter()
+    await asyncio.gather(*(login(*entry) for entry in logins))
+    elapsed = time.perf_counter() - started
+    monitor_task.cancel()
+    signature_workers.shutdown()
+    return len(logins) / elapsed, max(lag) if lag else elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    logins = make_logins(args.logins)
+    print(f"cores available: {len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()}")
+    runs = [("inline", 1)] + [("thread", 4)] + [("process", n) for n in (1, 2, 4)]
+    for pool, workers in runs:
+        throughput, max_lag = asyncio.run(storm(logins, pool, workers, args.concurrency))
+        print(f"{pool:<8} workers={workers}  {throughput:8.0f} logins/s   max event loop lag {max_lag * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
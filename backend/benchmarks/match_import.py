@@ -0,0 +1,101 @@
+"""
+Benchmark: match import, per-row SELECT + add (the previous import_matches)
+vs chunked INSERT ... ON CONFLICT (app.api.matches.upsert_matches)
+
+Writes to the configured DATABASE_URL; rows use a unique external_id prefix
+and are deleted afterwards. Run from backend/:
+
+    python -m benchmarks.match_import --sizes 100 1000 10000
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.api.matches import MatchCreate, _dedupe, upsert_matches
+from app.core.bulk import chunked
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.match import Match
+
+
+def make_matches(prefix: str, count: int, shift_hours: int = 0) -> list:
+    start = datetime(2026, 10, 1, 23, 0, tzinfo=timezone.utc)
+    return [
+        MatchCreate(
+            external_id=f"{prefix}-{i}",
+            home_team=f"Home {i % 32}",
+            away_team=f"Away {(i + 7) % 32}",
+            start_time=start + timedelta(hours=i // 8 + shift_hours),
+            league="NHL",
+            sport="hockey",
+        )
+        for i in range(count)
+    ]
+
+
+def per_row(db, matches) -> None:
+    for match_data in matches:
+        existing = db.query(Match).filter(Match.external_id == match_data.external_id).first()
+        if existing:
+            continue
+        db.add(Match(**match_data.model_dump()))
+    db.commit()
+
+
+def bulk(db, matches) -> None:
+    for chunk in chunked(_dedupe(matches).values(), settings.MATCH_IMPORT_CHUNK_SIZE):
+        upsert_matches(db, chunk)
+
+
+def timed(func, matches) -> float:
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        func(db, matches)
+        return time.perf_counter() - started
+    finally:
+        db.close()
+
+
+def cleanup(prefix: str) -> None:
+    db = SessionLocal()
+    try:
+        db.query(Match).filter(Match.external_id.like(f"{prefix}-%")).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    print(f"{'matches':>8}  {'scenario':<12} {'per-row':>10} {'bulk':>10} {'speedup':>8}")
+    for size in args.sizes:
+        prefix = f"bench-{uuid.uuid4().hex[:8]}"
+        fresh = make_matches(prefix, size)
+        rescheduled = make_matches(prefix, size, shift_hours=2)
+        try:
+            # per-row: fresh insert, then re-import of the same rows (all SELECT hits)
+            row_fresh = timed(per_row, fresh)
+            row_again = timed(per_row, fresh)
+            cleanup(prefix)
+            bulk_fresh = timed(bulk, fresh)
+            bulk_again = timed(bulk, fresh)
+            bulk_moved = timed(bulk, rescheduled)
+        finally:
+            cleanup(prefix)
+        for scenario, row_s, bulk_s in (
+            ("insert", row_fresh, bulk_fresh),
+            ("re-import", row_again, bulk_again),
+            ("reschedule", None, bulk_moved),
+        ):
+            row_col = f"{row_s * 1000:8.1f}ms" if row_s is not None else f"{'n/a':>10}"
+            speedup = f"{row_s / bulk_s:7.1f}x" if row_s is not None else ""
+            print(f"{size:>8}  {scenario:<12} {row_col} {bulk_s * 1000:8.1f}ms {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
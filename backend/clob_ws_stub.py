@@ -0,0 +1,91 @@
+"""
+Local stub of the Polymarket CLOB market websocket channel
+
+Sends a `book` snapshot for every subscribed token and random `price_change`
+deltas afterwards. With --snapshot-delay the snapshot comes late, so deltas
+arrive first (as they can after a reconnect). Point the backend at it for
+local testing:
+
+    python clob_ws_stub.py --port 8765
+    POLY_CLOB_WS_URL=ws://localhost:8765/ws/market python run.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from websockets.asyncio.server import serve
+
+
+def _book(token_id: str) -> dict:
+    mid = random.randint(20, 80) / 100
+    return {
+        "event_type": "book",
+        "asset_id": token_id,
+        "market": f"0xstub{token_id}",
+        "bids": [{"price": f"{mid - i / 100:.2f}", "size": str(random.randint(10, 500))} for i in range(10, 0, -1)],
+        "asks": [{"price": f"{mid + i / 100:.2f}", "size": str(random.randint(10, 500))} for i in range(10, 0, -1)],
+        "timestamp": str(int(time.time() * 1000)),
+        "hash": "stub",
+    }
+
+
+def _price_change(token_ids) -> dict:
+    return {
+        "event_type": "price_change",
+        "market": "0xstub",
+        "timestamp": str(int(time.time() * 1000)),
+        "price_changes": [
+            {
+                "asset_id": token_id,
+                "side": random.choice(["BUY", "SELL"]),
+                "price": f"{random.randint(1, 99) / 100:.2f}",
+                "size": str(random.choice([0, random.randint(10, 500)])),
+            }
+            for token_id in token_ids
+        ],
+    }
+
+
+async def handler(ws, interval: float, snapshot_delay: float = 0.0):
+    subscribed = set()
+
+    async def push_deltas():
+        while True:
+            await asyncio.sleep(interval)
+            if subscribed:
+                await ws.send(json.dumps(_price_change(sorted(subscribed))))
+
+    pusher = asyncio.ensure_future(push_deltas())
+    try:
+        async for raw in ws:
+            if raw == "PING":
+                await ws.send("PONG")
+                continue
+            message = json.loads(raw)
+            tokens = message.get("assets_ids") or []
+            if message.get("operation") == "unsubscribe":
+                subscribed.difference_update(tokens)
+                continue
+            subscribed.update(tokens)
+            await asyncio.sleep(snapshot_delay)
+            await ws.send(json.dumps([_book(token_id) for token_id in tokens]))
+    finally:
+        pusher.cancel()
+
+
+async def main(host: str, port: int, interval: float, snapshot_delay: float):
+    async with serve(lambda ws: handler(ws, interval, snapshot_delay), host, port):
+        print(f"[CLOB WS stub] Listening on ws://{host}:{port}/ws/market")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between price_change messages")
+    parser.add_argument("--snapshot-delay", type=float, default=0.0, help="seconds before a subscription's book snapshot")
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port, args.interval, args.snapshot_delay))
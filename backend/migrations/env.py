@@ -10,7 +10,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from app.core.database import Base
 from app.core.config import settings
-from app.models import User, Match, PolymarketMarket
+from app.models import User, Match, PolymarketMarket, AuthNonce
 
 # this is the Alembic Config object
 config = context.config
@@ -0,0 +1,31 @@
+"""add_users_wallet_address_index
+
+Revision ID: 7b3e9c1d2a45
+Revises: ef997d80f2cb
+Create Date: 2026-10-17 10:12:31.418204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3e9c1d2a45'
+down_revision = 'ef997d80f2cb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # get_current_user looks users up by wallet_address on every authenticated request.
+    # CONCURRENTLY avoids locking users for writes while the index builds (PostgreSQL only).
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_wallet_address', 'users', ['wallet_address'],
+            unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_wallet_address', table_name='users', postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+"""add_auth_nonces
+
+Revision ID: a41c6f0e8d27
+Revises: 7b3e9c1d2a45
+Create Date: 2026-10-17 11:03:52.907316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41c6f0e8d27'
+down_revision = '7b3e9c1d2a45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('auth_nonces',
+    sa.Column('address', sa.String(), nullable=False),
+    sa.Column('nonce', sa.String(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('address')
+    )
+    op.create_index(op.f('ix_auth_nonces_expires_at'), 'auth_nonces', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_auth_nonces_expires_at'), table_name='auth_nonces')
+    op.drop_table('auth_nonces')
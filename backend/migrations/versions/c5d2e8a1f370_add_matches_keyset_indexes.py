@@ -0,0 +1,39 @@
+"""add_matches_keyset_indexes
+
+Revision ID: c5d2e8a1f370
+Revises: a41c6f0e8d27
+Create Date: 2026-10-17 14:21:07.530118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d2e8a1f370'
+down_revision = 'a41c6f0e8d27'
+branch_labels = None
+depends_on = None
+
+# GET /api/matches pages by (start_time, id); a filter column first lets
+# "today's NHL games" be one range scan that is already in page order
+INDEXES = (
+    ('ix_matches_start_time_id', ['start_time', 'id']),
+    ('ix_matches_league_start_time_id', ['league', 'start_time', 'id']),
+    ('ix_matches_sport_start_time_id', ['sport', 'start_time', 'id']),
+    ('ix_matches_home_team_start_time_id', ['home_team', 'start_time', 'id']),
+    ('ix_matches_away_team_start_time_id', ['away_team', 'start_time', 'id']),
+)
+
+
+def upgrade() -> None:
+    # CONCURRENTLY avoids blocking match imports while the indexes build (PostgreSQL only)
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, 'matches', columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name='matches', postgresql_concurrently=True)
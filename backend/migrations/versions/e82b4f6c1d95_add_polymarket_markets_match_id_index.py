@@ -0,0 +1,31 @@
+"""add_polymarket_markets_match_id_index
+
+Revision ID: e82b4f6c1d95
+Revises: c5d2e8a1f370
+Create Date: 2026-10-17 15:02:44.118352
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e82b4f6c1d95'
+down_revision = 'c5d2e8a1f370'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Markets are loaded per match (joined / selectin eager loads, portfolio join);
+    # PostgreSQL does not index foreign key columns by itself.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_polymarket_markets_match_id', 'polymarket_markets', ['match_id'],
+            unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_polymarket_markets_match_id', table_name='polymarket_markets', postgresql_concurrently=True)
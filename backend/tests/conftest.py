@@ -0,0 +1,21 @@
+"""
+Run from backend/:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Required Settings fields; a local .env or real environment takes precedence
+for name, value in {
+    "DATABASE_URL": "sqlite://",
+    "JWT_SECRET": "test",
+    "POLY_BUILDER_KEY": "test",
+    "POLY_BUILDER_SECRET": "test",
+    "POLY_BUILDER_PASSPHRASE": "test",
+    "POLY_BUILDER_PRIVATE_KEY": "0x1",
+}.items():
+    os.environ.setdefault(name, value)
+
+# backend/ itself, for clob_ws_stub
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
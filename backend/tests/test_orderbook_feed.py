@@ -0,0 +1,65 @@
+"""OrderBookFeed against the local CLOB websocket stub (clob_ws_stub.py)"""
+import asyncio
+import functools
+import time
+
+from websockets.asyncio.server import serve
+
+import clob_ws_stub
+from app.api import polymarket as polymarket_api
+from app.core.config import settings
+from app.polymarket.orderbook_feed import OrderBookFeed
+
+TOKEN = "token-1"
+REST_BOOK = {"market": "rest", "asset_id": TOKEN, "bids": [{"price": "0.10", "size": "1"}],
+             "asks": [{"price": "0.90", "size": "1"}], "hash": "rest", "timestamp": "0"}
+
+
+async def _until(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_reconnect_waits_for_fresh_snapshot(monkeypatch):
+    monkeypatch.setattr(settings, "ORDERBOOK_WS_TICK", 0.05)
+    monkeypatch.setattr(settings, "ORDERBOOK_SNAPSHOT_WAIT", 0.0)
+    monkeypatch.setattr(settings, "ORDERBOOK_WS_ENABLED", True)
+
+    async def rest_book(token_id):
+        return REST_BOOK
+
+    async def scenario():
+        # Deltas every 20 ms; each (re)subscription's snapshot comes 500 ms late
+        handler = functools.partial(clob_ws_stub.handler, interval=0.02, snapshot_delay=0.5)
+        async with serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            feed = OrderBookFeed(f"ws://127.0.0.1:{port}/ws/market")
+            monkeypatch.setattr(polymarket_api, "orderbook_feed", feed)
+            monkeypatch.setattr(polymarket_api.clob_client, "get_order_book", rest_book)
+            feed.touch(TOKEN)
+            feed.start()
+            try:
+                await _until(lambda: feed.is_live(TOKEN))
+                stale = feed.books[TOKEN]
+
+                # Drop the connection; the stub sends deltas before the new snapshot
+                for connection in list(server.connections):
+                    await connection.close()
+                await _until(lambda: not feed.connected)
+                await _until(lambda: feed.connected)
+                deltas = feed.deltas
+                await asyncio.sleep(0.2)
+
+                assert feed.deltas == deltas, "deltas applied to the pre-disconnect book"
+                assert not feed.is_live(TOKEN)
+                assert (await polymarket_api._get_order_book(TOKEN)).hash == "rest"
+
+                await _until(lambda: feed.is_live(TOKEN))
+                assert feed.books[TOKEN] is stale  # same object, rebuilt from the new snapshot
+                assert (await polymarket_api._get_order_book(TOKEN)).hash == "stub"
+            finally:
+                await feed.stop()
+
+    asyncio.run(scenario())